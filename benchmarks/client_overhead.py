@@ -0,0 +1,88 @@
+"""
+What CORS enforcement costs each client, measured against in-process fakes.
+
+    python benchmarks/client_overhead.py [count]
+
+Each request is sent once as it is and once through the enforcing wrapper;
+both go to a fake server, so the difference is the cost of enforcement alone.
+A preflight cache is used, as it would be in production.
+
+"""
+from __future__ import absolute_import
+
+import sys
+import time
+
+import requests
+from tornado.gen import coroutine
+from tornado.httpclient import HTTPRequest
+from tornado.ioloop import IOLoop
+
+from cors.cache import PreflightCache
+from cors.clients.requests import send
+from cors.clients.tornado import cors_enforced_fetch
+from cors.fakes.requests import fake_session
+from cors.fakes.tornado import FakeAsyncHTTPClient
+from cors.policy import Policy
+
+
+POLICY = Policy(origins=["http://app.example.com"], methods=["GET", "PUT"], max_age=600)
+URL = "http://api.example.com/items"
+HEADERS = {"Origin": "http://app.example.com", "Content-Type": "application/json"}
+
+
+def rate(count, function):
+    start = time.time()
+    function(count)
+    return count / (time.time() - start)
+
+
+def report(name, plain, enforced):
+    print "%-8s plain %8.0f/s  enforced %8.0f/s  overhead %6.1fus per request" % (
+        name, plain, enforced, 1e6 * (1 / enforced - 1 / plain))
+
+
+def requests_benchmark(count):
+    session = fake_session(POLICY)
+    cache = PreflightCache()
+    request = requests.Request("PUT", URL, headers=HEADERS, data="{}").prepare()
+
+    def plain(n):
+        for _ in xrange(n):
+            session.send(request)
+
+    def enforced(n):
+        for _ in xrange(n):
+            send(request, session, cache=cache)
+
+    report("requests", rate(count, plain), rate(count, enforced))
+
+
+def tornado_benchmark(count):
+    client = FakeAsyncHTTPClient(force_instance=True, policies=POLICY)
+    cache = PreflightCache()
+    loop = IOLoop.current()
+
+    def request():
+        return HTTPRequest(URL, "PUT", headers=HEADERS, body="{}")
+
+    def run(fetch):
+        @coroutine
+        def loop_body(n):
+            for _ in xrange(n):
+                yield fetch(request())
+        return lambda n: loop.run_sync(lambda: loop_body(n))
+
+    plain = run(client.fetch)
+    enforced = run(lambda r: cors_enforced_fetch(client, r, cache=cache))
+    report("tornado", rate(count, plain), rate(count, enforced))
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 20000
+    requests_benchmark(count)
+    tornado_benchmark(count)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,88 @@
+"""
+Bytes each request keeps alive, before and after slotting `Request`.
+
+    python benchmarks/memory.py [count]
+
+Everything a request and its checks refer to is counted: the url, the headers
+dict with its names and values, kwargs and the method. Objects shared between
+requests, like interned methods and shared check tuples, are counted once.
+
+"""
+import random
+import sys
+import types
+
+from cors.preflight import prepare_preflight
+from cors.utils import Request
+
+
+class DictRequest(object):
+    # how Request used to be, for comparison
+    def __init__(self, method, url, headers=None, **kwargs):
+        self.method = method
+        self.url = url
+        self.headers = headers or {}
+        self.kwargs = kwargs
+
+
+def _retained(objects):
+    # the size of everything reachable from objects, each object once; the
+    # check functions and classes exist whether or not any request does
+    shared = (types.FunctionType, types.ModuleType, type)
+    seen = set()
+    total = 0
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, shared):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return total
+
+
+def _shapes(count):
+    methods = ["GET", "POST", "PUT", "DELETE"]
+    for i in xrange(count):
+        yield (
+            random.choice(methods),
+            "http://api.example.com/items/%d" % i,
+            {"Origin": "http://app.example.com", "X-Request-Id": str(i)},
+        )
+
+
+def measure(cls, count):
+    kept = []
+    for method, url, headers in _shapes(count):
+        # copy the method as a parser reading it off the wire would
+        request = cls(str(bytearray(method)), url, headers)
+        _, checks = prepare_preflight(request)
+        if cls is DictRequest:
+            # a fresh list of checks for every request
+            checks = list(checks)
+        kept.extend((request, checks))
+    return float(_retained(kept)) / count
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 100000
+    before = measure(DictRequest, count)
+    after = measure(Request, count)
+    print "before: %6.1f bytes per request" % before
+    print "after:  %6.1f bytes per request" % after
+    print "saved:  %5.1f%%" % (100 * (before - after) / before)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
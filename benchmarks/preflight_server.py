@@ -0,0 +1,81 @@
+"""
+Preflights per second answered by a Tornado handler and by `PreflightDelegate`.
+
+    python benchmarks/preflight_server.py [requests] [connections]
+
+Client and servers share one process and IOLoop, so the figures are only
+useful compared with each other.
+
+"""
+import sys
+import time
+
+from tornado.gen import coroutine, multi, Return
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.netutil import bind_sockets
+from tornado.tcpclient import TCPClient
+from tornado.web import Application, RequestHandler
+
+from cors.policy import Policy
+from cors.servers.tornado import PreflightDelegate
+
+
+POLICY = Policy(origins=["http://app.example.com"], methods=["GET", "PUT"], max_age=600)
+
+PREFLIGHT = (
+    "OPTIONS /api/items HTTP/1.1\r\n"
+    "Host: localhost\r\n"
+    "Origin: http://app.example.com\r\n"
+    "Access-Control-Request-Method: PUT\r\n"
+    "Access-Control-Request-Headers: Content-Type\r\n\r\n")
+
+
+class PreflightHandler(RequestHandler):
+    def options(self, path):
+        headers = POLICY.preflight_response_headers(self.request.headers)
+        for name, value in headers.items():
+            self.set_header(name, value)
+        self.set_status(204)
+
+
+def serve(application):
+    sockets = bind_sockets(0, "127.0.0.1")
+    HTTPServer(application).add_sockets(sockets)
+    return sockets[0].getsockname()[1]
+
+
+@coroutine
+def hammer(port, count):
+    stream = yield TCPClient().connect("127.0.0.1", port)
+    for _ in xrange(count):
+        yield stream.write(PREFLIGHT)
+        response = yield stream.read_until("\r\n\r\n")
+        assert response.startswith("HTTP/1.1 204"), response
+    stream.close()
+
+
+@coroutine
+def measure(port, requests, connections):
+    start = time.time()
+    yield multi([hammer(port, requests // connections) for _ in range(connections)])
+    raise Return(requests / (time.time() - start))
+
+
+def main(argv):
+    requests = int(argv[1]) if len(argv) > 1 else 20000
+    connections = int(argv[2]) if len(argv) > 2 else 8
+    application = Application([(r"/(.*)", PreflightHandler)])
+    handler_port = serve(application)
+    delegate_port = serve(PreflightDelegate(application, POLICY))
+
+    loop = IOLoop.current()
+    handler = loop.run_sync(lambda: measure(handler_port, requests, connections))
+    delegate = loop.run_sync(lambda: measure(delegate_port, requests, connections))
+    print "handler:  %8.0f preflights/s" % handler
+    print "delegate: %8.0f preflights/s" % delegate
+    print "speedup:  %8.2fx" % (delegate / handler)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
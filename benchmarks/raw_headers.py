@@ -0,0 +1,58 @@
+"""
+Raw header blocks parsed per second, decoding every header into a `HeadersDict`
+and reading only what CORS needs with `cors.raw`.
+
+    python benchmarks/raw_headers.py [count]
+
+"""
+import sys
+import time
+
+from cors.raw import parse_header_block
+from cors.utils import HeadersDict
+
+
+BLOCK = b"".join([
+    b"OPTIONS /api/items HTTP/1.1\r\n",
+    b"Host: api.example.com\r\n",
+    b"Origin: https://app.example.com\r\n",
+    b"Access-Control-Request-Method: PUT\r\n",
+    b"Access-Control-Request-Headers: content-type,x-request-id\r\n",
+    b"User-Agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)\r\n",
+    b"Accept: */*\r\n",
+    b"Accept-Encoding: gzip, deflate, br\r\n",
+    b"Accept-Language: en-GB,en;q=0.9\r\n",
+    b"Referer: https://app.example.com/dashboard/items?page=3\r\n",
+    b"Cookie: %s\r\n" % (b"session=" + b"x" * 400),
+    b"Sec-Fetch-Mode: cors\r\n",
+    b"Sec-Fetch-Site: same-site\r\n",
+    b"Sec-Fetch-Dest: empty\r\n",
+    b"X-Forwarded-For: 10.0.0.1, 10.0.0.2\r\n",
+    b"\r\n",
+])
+
+
+def decode_all(block):
+    headers = HeadersDict()
+    for line in block.decode("latin-1").split("\r\n")[1:]:
+        if line:
+            name, value = line.split(":", 1)
+            headers[name] = value.strip()
+    return headers
+
+
+def rate(count, parse):
+    start = time.time()
+    for _ in xrange(count):
+        parse(BLOCK)
+    return count / (time.time() - start)
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 100000
+    print "HeadersDict %8.0f/s" % rate(count, decode_all)
+    print "cors.raw    %8.0f/s" % rate(count, parse_header_block)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
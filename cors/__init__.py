@@ -0,0 +1,77 @@
+import importlib
+import sys
+import types
+
+
+# Public names and the modules they live in. They are only imported when first
+# used so that importing the package itself stays cheap.
+_PUBLIC = {
+    "AccessControlError": "cors.errors",
+    "CORSError": "cors.errors",
+    "HeadersDict": "cors.utils",
+    "ProtectedHTTPHeaders": "cors.utils",
+    "Request": "cors.utils",
+    "check_headers": "cors.preflight",
+    "check_method": "cors.preflight",
+    "check_origin": "cors.preflight",
+    "generate_acceptable_actual_response_headers": "cors.preflight",
+    "generate_acceptable_preflight_response_headers": "cors.preflight",
+    "prepare_preflight": "cors.preflight",
+    "Policy": "cors.policy",
+    "PolicyRegistry": "cors.routes",
+    "PreflightCache": "cors.cache",
+    "Auditor": "cors.audit",
+}
+
+_SUBMODULES = set([
+    "audit",
+    "cache",
+    "clients",
+    "definitions",
+    "errors",
+    "fakes",
+    "lazy",
+    "plans",
+    "raw",
+    "policy",
+    "preflight",
+    "reload",
+    "routes",
+    "scan",
+    "servers",
+    "snapshot",
+    "tracking",
+    "tuning",
+    "utils",
+    "warmup",
+])
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name in self._public:
+            value = getattr(importlib.import_module(self._public[name]), name)
+        elif name in self._submodules:
+            value = importlib.import_module("%s.%s" % (self.__name__, name))
+        else:
+            raise AttributeError(
+                "'module' object has no attribute %r" % name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._public) | self._submodules)
+
+
+_module = _LazyModule(__name__, __doc__)
+_module.__dict__.update({
+    "__file__": __file__,
+    "__path__": __path__,
+    "__package__": __name__,
+    "__all__": sorted(_PUBLIC),
+    "_public": _PUBLIC,
+    "_submodules": _SUBMODULES,
+    # modules are torn down once nothing refers to them; keep this one around
+    "_original": sys.modules[__name__],
+})
+sys.modules[__name__] = _module
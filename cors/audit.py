@@ -0,0 +1,53 @@
+import logging
+import random
+import threading
+from collections import deque
+
+
+log = logging.getLogger(__name__)
+
+
+class Auditor(object):
+    """
+    Records CORS violations instead of raising them.
+
+    Clients given an auditor only validate a sample_rate fraction of requests;
+    the rest are sent without any preflight or checks. Every
+    `AccessControlError` raised while validating a sampled request is kept in
+    `records`, which holds the most recent max_records of them, and passed to
+    observer if one is given.
+
+    """
+    def __init__(self, sample_rate=1.0, max_records=1000, observer=None):
+        self.sample_rate = sample_rate
+        self.observer = observer
+        self.records = deque(maxlen=max_records)
+        self.sampled = 0
+        self.skipped = 0
+        self.violations = 0
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """
+        Decide whether the next request should be validated.
+
+        """
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        with self._lock:
+            if sampled:
+                self.sampled += 1
+            else:
+                self.skipped += 1
+        return sampled
+
+    def record(self, error):
+        with self._lock:
+            self.violations += 1
+        self.records.append(error)
+
+        if self.observer is not None:
+            # a broken observer mustn't break the request being audited
+            try:
+                self.observer(error)
+            except Exception:
+                log.exception("CORS audit observer failed")
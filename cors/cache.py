@@ -0,0 +1,541 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from cors.definitions import CORS_RESPONSE_HEADERS, POLICY_VERSION_HEADER
+from cors.errors import AccessControlError
+from cors.lazy import LazyModule
+from cors.utils import HeadersDict
+
+
+urlparse = LazyModule("urlparse")
+
+# User-Agents fall back to caching a preflight for 5 seconds when the response
+# does not specify an Access-Control-Max-Age.
+DEFAULT_MAX_AGE = 5
+
+
+def _lower_keys(headers):
+    return dict([(k.lower(), v) for k, v in headers.items()])
+
+def preflight_key(preflight, request):
+    """
+    Identify the preflight response which will be received for a request.
+
+    """
+    request_headers = _lower_keys(request.headers)
+    preflight_headers = _lower_keys(preflight.headers)
+    requested = preflight_headers.get("access-control-request-headers", "")
+    requested = sorted(set(
+        h.strip().lower() for h in requested.split(",") if h.strip()))
+    return (
+        request_headers.get("origin", ""),
+        preflight.url,
+        preflight_headers.get("access-control-request-method", "").upper(),
+        ",".join(requested),
+    )
+
+def _server(url):
+    # the scheme://host[:port] a request to url is sent to
+    parts = urlparse.urlparse(url)
+    return "%s://%s" % (parts.scheme.lower(), parts.netloc.lower())
+
+def _from_server(url, server):
+    return server is None or _server(url) == server
+
+def get_max_age(headers, default=DEFAULT_MAX_AGE):
+    max_age = _lower_keys(headers).get("access-control-max-age")
+    try:
+        return max(int(max_age), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+class CachedPreflight(object):
+    """
+    A preflight response reduced to the headers needed by the checks.
+
+    """
+    def __init__(self, headers, expires, ok=True, error=None):
+        self.headers = HeadersDict()
+        for name, value in headers.items():
+            if name.lower() in CORS_RESPONSE_HEADERS:
+                self.headers[name] = value
+        self.expires = expires
+        self.ok = ok
+        self.error = error
+
+    @classmethod
+    def from_response(cls, response, now=None):
+        now = time.time() if now is None else now
+        return cls(response.headers, now + get_max_age(response.headers))
+
+    @classmethod
+    def loads(cls, data):
+        data = json.loads(data)
+        return cls(data["headers"], data["expires"], data["ok"], data.get("error"))
+
+    def dumps(self):
+        return json.dumps({
+            "headers": dict(self.headers),
+            "expires": self.expires,
+            "ok": self.ok,
+            "error": self.error,
+        }, sort_keys=True, separators=(",", ":"))
+
+    def is_fresh(self, now=None):
+        now = time.time() if now is None else now
+        return self.expires > now
+
+
+class CacheBackend(object):
+    """
+    Storage for preflight cache entries.
+
+    Keys are the tuples generated by `preflight_key` and values are
+    `CachedPreflight` instances. Backends must not return an entry once its ttl
+    (in seconds) has passed and each call must be atomic with respect to every
+    other user of the same storage.
+
+    """
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, entry, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def delete_origin(self, origin, server=None):
+        """
+        Delete every entry for requests from origin, or only those for
+        requests to server when given, as a "scheme://host[:port]" string.
+
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process storage keeping the most recently used max_entries entries.
+
+    """
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or not entry.is_fresh():
+                return None
+            self._entries[key] = entry
+            return entry
+
+    def set(self, key, entry, ttl):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_origin(self, origin, server=None):
+        with self._lock:
+            for key in [
+                    k for k in self._entries
+                    if k[0] == origin and _from_server(k[1], server)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _intern(value):
+    return intern(value) if type(value) is str else value
+
+
+class PartitionedBackend(CacheBackend):
+    """
+    In-process storage partitioned by origin, for a client sending requests
+    on behalf of many origins.
+
+    Each origin's entries are kept together, so dropping them all is one
+    operation, and as plain tuples of interned strings rather than
+    `CachedPreflight` objects, so thousands of origins cost little memory.
+    Once there are more than max_entries entries, the partitions of the least
+    recently used origins are dropped whole.
+
+    """
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._partitions = OrderedDict()
+        self._count = 0
+
+    def _partition(self, origin):
+        partition = self._partitions.pop(origin, None)
+        if partition is not None:
+            self._partitions[origin] = partition
+        return partition
+
+    def get(self, key):
+        with self._lock:
+            partition = self._partition(key[0])
+            if partition is None:
+                return None
+            entry = partition.get(key[1:])
+            if entry is None:
+                return None
+            expires, headers, ok, error = entry
+            if expires <= time.time():
+                del partition[key[1:]]
+                self._count -= 1
+                return None
+        return CachedPreflight(dict(headers), expires, ok, error)
+
+    def set(self, key, entry, ttl):
+        headers = tuple(sorted(
+            (_intern(name), _intern(value))
+            for name, value in entry.headers.items()))
+        compact = (time.time() + ttl, headers, entry.ok, entry.error)
+        origin = _intern(key[0])
+        with self._lock:
+            partition = self._partition(origin)
+            if partition is None:
+                partition = self._partitions[origin] = {}
+            subkey = tuple(_intern(part) for part in key[1:])
+            if subkey not in partition:
+                self._count += 1
+            partition[subkey] = compact
+            while self._count > self.max_entries and len(self._partitions) > 1:
+                _, dropped = self._partitions.popitem(last=False)
+                self._count -= len(dropped)
+
+    def delete(self, key):
+        with self._lock:
+            partition = self._partitions.get(key[0])
+            if partition is not None and partition.pop(key[1:], None) is not None:
+                self._count -= 1
+
+    def delete_origin(self, origin, server=None):
+        with self._lock:
+            if server is None:
+                self._count -= len(self._partitions.pop(origin, ()))
+                return
+            partition = self._partitions.get(origin, {})
+            for subkey in [k for k in partition if _from_server(k[0], server)]:
+                del partition[subkey]
+                self._count -= 1
+
+    def clear(self):
+        with self._lock:
+            self._partitions.clear()
+            self._count = 0
+
+    @property
+    def origins(self):
+        return len(self._partitions)
+
+    def __len__(self):
+        return self._count
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Storage in an SQLite database file shared by processes on one host.
+
+    """
+    def __init__(self, path, table="cors_preflights", timeout=5.0):
+        import sqlite3
+        self._connect = sqlite3.connect
+        self.path = path
+        self.table = table
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS %s ("
+                "key TEXT PRIMARY KEY, "
+                "origin TEXT NOT NULL, "
+                "entry TEXT NOT NULL, "
+                "expires REAL NOT NULL)" % self.table)
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS %s_origin ON %s (origin)"
+                % (self.table, self.table))
+
+    def _connection(self):
+        # sqlite connections can't be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self._connect(self.path, timeout=self.timeout)
+            db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    @staticmethod
+    def _key(key):
+        return json.dumps(list(key), separators=(",", ":"))
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT entry FROM %s WHERE key = ? AND expires > ?" % self.table,
+            (self._key(key), time.time())).fetchone()
+        return CachedPreflight.loads(row[0]) if row else None
+
+    def set(self, key, entry, ttl):
+        with self._connection() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO %s VALUES (?, ?, ?, ?)" % self.table,
+                (self._key(key), key[0], entry.dumps(), time.time() + ttl))
+
+    def delete(self, key):
+        with self._connection() as db:
+            db.execute(
+                "DELETE FROM %s WHERE key = ?" % self.table,
+                (self._key(key),))
+
+    def delete_origin(self, origin, server=None):
+        with self._connection() as db:
+            if server is None:
+                db.execute(
+                    "DELETE FROM %s WHERE origin = ?" % self.table,
+                    (origin,))
+                return
+            keys = [
+                (key,) for key, in db.execute(
+                    "SELECT key FROM %s WHERE origin = ?" % self.table,
+                    (origin,))
+                if _from_server(json.loads(key)[1], server)]
+            db.executemany("DELETE FROM %s WHERE key = ?" % self.table, keys)
+
+    def purge(self):
+        """
+        Delete expired entries from the database.
+
+        """
+        with self._connection() as db:
+            db.execute(
+                "DELETE FROM %s WHERE expires <= ?" % self.table,
+                (time.time(),))
+
+    def clear(self):
+        with self._connection() as db:
+            db.execute("DELETE FROM %s" % self.table)
+
+    def __len__(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM %s WHERE expires > ?" % self.table,
+            (time.time(),)).fetchone()[0]
+
+
+class RedisBackend(CacheBackend):
+    """
+    Storage in a Redis server, or anything else speaking its protocol.
+
+    client may be any object with the `get`, `set`, `delete` and `scan_iter`
+    methods of a `redis.StrictRedis` client; one is created from url when it
+    isn't given, which requires the redis package.
+
+    """
+    def __init__(self, client=None, url="redis://localhost:6379/0", prefix="cors:preflight:"):
+        if client is None:
+            import redis
+            client = redis.StrictRedis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key):
+        return self.prefix + json.dumps(list(key), separators=(",", ":"))
+
+    def get(self, key):
+        entry = self.client.get(self._key(key))
+        return CachedPreflight.loads(entry) if entry is not None else None
+
+    def set(self, key, entry, ttl):
+        self.client.set(self._key(key), entry.dumps(), px=int(ttl * 1000))
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def _keys(self, prefix=""):
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", self.prefix + prefix) + "*"
+        return self.client.scan_iter(match=pattern)
+
+    def delete_origin(self, origin, server=None):
+        # keys are JSON lists which start with the origin
+        for key in self._keys(json.dumps([origin])[:-1] + ","):
+            if server is None or _from_server(
+                    json.loads(key[len(self.prefix):])[1], server):
+                self.client.delete(key)
+
+    def clear(self):
+        for key in self._keys():
+            self.client.delete(key)
+
+    def __len__(self):
+        return sum(1 for _ in self._keys())
+
+
+class PreflightCache(object):
+    """
+    Thread-safe cache of preflight responses.
+
+    Entries are kept in a `CacheBackend`, by default a `MemoryBackend`, until
+    the Access-Control-Max-Age of their response passes. Concurrent misses on
+    a key are coordinated through a number of lock stripes so that only one
+    preflight request is made for it, without threads working on unrelated
+    preflights contending with each other.
+
+    With a negative_ttl, failed preflights and failed checks are remembered for
+    that many seconds and requests with the same key are rejected without being
+    sent; `suppressed` counts how many were.
+
+    Responses from servers whose policies send a CORS-Policy-Version header are
+    passed to `observe_response`. Versions are tracked for each origin and
+    server, and when the version a server sends to an origin changes the
+    origin's entries for that server are dropped; `invalidated` counts how
+    often.
+
+    """
+    def __init__(self, backend=None, stripes=16, negative_ttl=0):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.negative_ttl = negative_ttl
+        self.suppressed = 0
+        self.invalidated = 0
+        self._versions = {}
+        self._stripes = [
+            (threading.Lock(), {})
+            for _ in range(stripes)
+        ]
+        self._counter_lock = threading.Lock()
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, entry):
+        ttl = entry.expires - time.time()
+        if ttl > 0:
+            self.backend.set(key, entry, ttl)
+
+    def lookup(self, key):
+        """
+        Return a fresh entry for key, or None if there isn't one.
+
+        Raises AccessControlError if the key's preflight recently failed.
+
+        """
+        entry = self.backend.get(key)
+        if entry is not None and not entry.ok:
+            with self._counter_lock:
+                self.suppressed += 1
+            raise AccessControlError(entry.error, key[1])
+        return entry
+
+    def reject(self, key, error):
+        """
+        Remember that a preflight, or the checks against it, failed.
+
+        """
+        if self.negative_ttl > 0:
+            self.set(key, CachedPreflight(
+                {},
+                time.time() + self.negative_ttl,
+                ok=False,
+                error=str(error)))
+
+    def observe_version(self, origin, version, server=None):
+        """
+        Note the policy version server sent in a response to origin, dropping
+        the origin's entries for server if it differs from the last one seen.
+
+        Without a server, versions are tracked and entries dropped for origin
+        across every server.
+
+        """
+        if version is None:
+            return False
+        with self._counter_lock:
+            previous = self._versions.get((origin, server))
+            self._versions[(origin, server)] = version
+            changed = previous is not None and previous != version
+            if changed:
+                self.invalidated += 1
+        if changed:
+            self.backend.delete_origin(origin, server)
+        return changed
+
+    def observe_response(self, request, response):
+        """
+        `observe_version` for any preflight or actual response to request.
+
+        """
+        return self.observe_version(
+            _lower_keys(request.headers).get("origin", ""),
+            response.headers.get(POLICY_VERSION_HEADER),
+            _server(request.url))
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Return a fresh entry for key, calling fetch to create it if necessary.
+
+        Only one thread at a time will call fetch for a given key, others
+        wait for it to finish and use its result.
+
+        """
+        lock, pending = self._stripe(key)
+        while True:
+            entry = self.lookup(key)
+            if entry is not None:
+                return entry
+            with lock:
+                event = pending.get(key)
+                if event is None:
+                    event = pending[key] = threading.Event()
+                    break
+
+            # another thread is fetching this entry; if it fails we'll retry
+            event.wait()
+
+        try:
+            # the thread which last fetched it may have stored the entry
+            # between our lookup and claiming the key
+            entry = self.lookup(key)
+            if entry is not None:
+                return entry
+            try:
+                entry = fetch()
+            except AccessControlError as e:
+                self.reject(key, e)
+                raise
+            self.set(key, entry)
+            return entry
+        finally:
+            with lock:
+                del pending[key]
+            event.set()
+
+    def clear(self):
+        self.backend.clear()
+
+    def __len__(self):
+        return len(self.backend)
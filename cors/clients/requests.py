@@ -1,8 +1,13 @@
 from __future__ import absolute_import
 
-import requests
-
+from cors.cache import (
+    CachedPreflight,
+    PartitionedBackend,
+    PreflightCache,
+    preflight_key,
+)
 from cors.errors import AccessControlError
+from cors.lazy import LazyModule
 from cors.utils import ProtectedHTTPHeaders
 from cors.preflight import (
     check_origin,
@@ -10,49 +15,178 @@ from cors.preflight import (
 )
 
 
-def send(request, session=None, skip_checks_on_server_error=True, **kwargs):
+requests = LazyModule("requests")
+threads = LazyModule("multiprocessing.pool")
+
+
+def send_preflight(session, preflight):
+    preflight = requests.Request(
+        preflight.method,
+        preflight.url,
+        preflight.headers,
+        **preflight.kwargs).prepare()
+
+    response = session.send(preflight)
+    if not response.ok:
+        raise AccessControlError(
+            "Pre-flight check failed",
+            preflight.url,
+            preflight.method,
+            preflight.headers)
+    return response
+
+
+def check_preflight(session, preflight, checks, request, cache=None):
+    """
+    Send the preflight for a request, or reuse a cached response, and check
+    that it allows the request.
+
+    """
+    if cache is None:
+        response = send_preflight(session, preflight)
+    else:
+        def fetch():
+            response = send_preflight(session, preflight)
+            cache.observe_response(request, response)
+            return CachedPreflight.from_response(response)
+
+        key = preflight_key(preflight, request)
+        response = cache.get_or_fetch(key, fetch)
+
+    # check that the preflight response says its ok to send our followup.
+    # below check again that the preflight grants access to the response.
+    try:
+        for check in checks:
+            check(response, request)
+    except AccessControlError as e:
+        if cache is not None:
+            cache.reject(key, e)
+        raise
+
+
+def send(request, session=None, skip_checks_on_server_error=True, cache=None, auditor=None, **kwargs):
     """
     Send a request adhering to same-origin policy rules.
 
     Heads up; this function uses the requests library because most people do.
     If you intend to use another Python HTTP client, don't use this method
 
+    Passing a `cors.cache.PreflightCache` as cache lets preflight responses be
+    reused by subsequent requests until they expire.
+
+    Passing a `cors.audit.Auditor` as auditor records violations with it
+    instead of raising them, for the requests it samples. Requests it doesn't
+    sample are sent as they are.
+
     """
     session = session or requests.Session()
-    preflight, checks = prepare_preflight(request)
+    if auditor is not None and not auditor.sample():
+        return session.send(request, **kwargs)
 
-    print request
-    print preflight, checks
+    preflight, checks = prepare_preflight(request)
 
     if preflight is not None:
-        preflight = requests.Request(
-            preflight.method,
-            preflight.url,
-            preflight.headers,
-            **preflight.kwargs).prepare()
-
-        response = session.send(preflight)
-        if not response.ok:
-            raise AccessControlError(
-                "Pre-flight check failed",
-                preflight.url,
-                preflight.method,
-                preflight.headers)
-
-        # check that the preflight response says its ok to send our followup.
-        # below check again that the preflight grants access to the response.
-        for check in checks:
-            check(response, request)
+        try:
+            check_preflight(session, preflight, checks, request, cache)
+        except AccessControlError as e:
+            if auditor is None:
+                raise
+            auditor.record(e)
 
-    response = session.send(request, **kwargs)
+    # stream the response so that its headers can be checked before the body
+    # of a response we aren't allowed to read is downloaded.
+    stream = kwargs.pop("stream", False)
+    response = session.send(request, stream=True, **kwargs)
+    if cache is not None:
+        cache.observe_response(request, response)
 
     # double-check that the actual response included appropriate headers as well
     # skip checks in the case of a server error unless configured otherwise.
     if response.status_code / 100 != 5 or not skip_checks_on_server_error:
-        check_origin(response, request)
+        try:
+            check_origin(response, request)
+        except AccessControlError as e:
+            if auditor is None:
+                response.close()
+                raise
+            auditor.record(e)
+
+    if not stream:
+        response.content
 
-    # wrap the headers in a protective layer
-    exposed = response.headers.get("Access-Control-Expose-Headers", "")
-    response.headers = ProtectedHTTPHeaders(exposed, response.headers)
+    # wrap the headers in a protective layer, unless we're only auditing
+    if auditor is None:
+        exposed = response.headers.get("Access-Control-Expose-Headers", "")
+        response.headers = ProtectedHTTPHeaders(exposed, response.headers)
 
     return response
+
+
+def pooled_session(max_workers):
+    """
+    Create a session whose connection pool can serve max_workers threads.
+
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=max_workers,
+        pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def send_many(requests, session=None, max_workers=4, ordered=True, cache=None, **kwargs):
+    """
+    Send requests concurrently adhering to same-origin policy rules.
+
+    Requests are sent from a pool of max_workers threads sharing one session,
+    and thus one connection pool, as well as one preflight cache so that each
+    distinct preflight is only sent once.
+
+    Yields a `(request, response, error)` tuple per request, in the order the
+    requests were given or, when ordered is False, in the order they complete.
+    An `AccessControlError` raised for a request is returned as its error
+    rather than aborting the whole batch.
+
+    """
+    session = session or pooled_session(max_workers)
+    cache = cache if cache is not None else PreflightCache()
+
+    def send_one(request):
+        try:
+            response = send(request, session, cache=cache, **kwargs)
+        except AccessControlError as e:
+            return request, None, e
+        return request, response, None
+
+    pool = threads.ThreadPool(max_workers)
+    try:
+        results = pool.imap if ordered else pool.imap_unordered
+        for result in results(send_one, requests):
+            yield result
+    finally:
+        pool.terminate()
+
+
+class PartitionedClient(object):
+    """
+    Send requests on behalf of many origins through one connection pool.
+
+    Each call to `send` gives the Origin its request is sent from. Every
+    origin shares the client's session and preflight cache, whose entries are
+    kept per origin by a `cors.cache.PartitionedBackend`, so one process can
+    emulate thousands of browser origins without a session apiece.
+
+    """
+    def __init__(self, session=None, cache=None, max_connections=10, **kwargs):
+        self.session = session or pooled_session(max_connections)
+        self.cache = cache if cache is not None else PreflightCache(PartitionedBackend())
+        self.kwargs = kwargs
+
+    def send(self, request, origin, **kwargs):
+        request = request.copy()
+        request.headers["Origin"] = intern(str(origin))
+        for name, value in self.kwargs.items():
+            kwargs.setdefault(name, value)
+        return send(request, self.session, cache=self.cache, **kwargs)
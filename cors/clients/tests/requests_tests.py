@@ -3,13 +3,18 @@ from __future__ import absolute_import
 import unittest
 
 import mock
+import requests as python_requests
 
 from cors.clients import requests
 from cors import (
+    audit,
+    cache,
     errors,
     preflight,
     utils
 )
+from cors.fakes.requests import fake_session
+from cors.policy import Policy
 
 
 def _request(url="http://example.com", method="GET", headers=None, origin="http://example.com", **kwargs):
@@ -32,9 +37,12 @@ def _response(request=None, headers=None):
     response.headers = utils.HeadersDict(headers or {})
     return response
 
+def _prepared_request(method, url, headers=None, **kwargs):
+    return _request(url, method, headers, **kwargs)
+
 def _session():
     session = mock.MagicMock()
-    def send_(request):
+    def send_(request, **kwargs):
         return getattr(request, "_response", mock.MagicMock())
     session.send = mock.MagicMock(wraps=send_)
     return session
@@ -69,6 +77,21 @@ class Function_send_Tests(unittest.TestCase):
 
         self.assertEqual(context.exception.message, "Pre-flight check failed")
 
+    @mock.patch("cors.clients.requests.prepare_preflight")
+    def test_policy_version_observed(self, prepare):
+        prepare.return_value = (None, [])
+        preflights = cache.PreflightCache()
+        preflights.set(("http://example.com", "http://example.com/a", "PUT", ""),
+                       cache.CachedPreflight({}, 2 ** 31))
+        preflights.observe_version("http://example.com", "1", "http://example.com")
+        request = _request()
+        request._response.headers = utils.HeadersDict({"CORS-Policy-Version": "2"})
+
+        requests.send(request, _session(), cache=preflights)
+
+        self.assertEqual(preflights.invalidated, 1)
+        self.assertEqual(len(preflights), 0)
+
     @mock.patch("requests.Request", wraps=_request)
     @mock.patch("cors.clients.requests.prepare_preflight")
     def test_preflight_checks_fail(self, prepare, _):
@@ -118,3 +141,211 @@ class Function_send_Tests(unittest.TestCase):
         self.assertNotIn(
             "Content-Type",
             response.headers["Access-Control-Allow-Headers"])
+
+    @mock.patch("cors.clients.requests.prepare_preflight")
+    def test_disallowed_response_closed_before_body(self, prepare):
+        prepare.return_value = (None, [])
+        request = _request(origin="http://foo")
+        request._response = _response()
+        request._response.status_code = 200
+        content = type(request._response).content = mock.PropertyMock()
+        session = _session()
+
+        with self.assertRaises(errors.AccessControlError):
+            requests.send(request, session)
+
+        self.assertTrue(session.send.call_args[1]["stream"])
+        self.assertEqual(request._response.close.call_count, 1)
+        self.assertEqual(content.call_count, 0)
+
+    @mock.patch("cors.clients.requests.prepare_preflight")
+    def test_body_read_unless_streaming(self, prepare):
+        prepare.return_value = (None, [])
+        request = _request()
+        request._response = _response()
+        request._response.status_code = 200
+        content = type(request._response).content = mock.PropertyMock()
+
+        requests.send(request, _session())
+        requests.send(request, _session(), stream=True)
+
+        self.assertEqual(content.call_count, 1)
+
+    @mock.patch("requests.Request", wraps=_prepared_request)
+    def test_audit_records_violations(self, _):
+        auditor = audit.Auditor()
+        request = _request(origin="http://foo", headers={"X-Foo": "bar"})
+        request._response = _response()
+        request._response.status_code = 200
+        session = _session()
+        session.send.side_effect = lambda r, **kwargs: (
+            _response() if r.method == "OPTIONS" else request._response)
+
+        response = requests.send(request, session, auditor=auditor)
+
+        self.assertIs(response, request._response)
+        self.assertNotIsInstance(response.headers, utils.ProtectedHTTPHeaders)
+        self.assertEqual(len(auditor.records), 2)
+        self.assertRegexpMatches(auditor.records[0].message, "Origin .* not allowed")
+        self.assertRegexpMatches(auditor.records[1].message, "Origin .* not allowed")
+
+    @mock.patch("cors.clients.requests.prepare_preflight")
+    def test_audit_unsampled_requests_not_checked(self, prepare):
+        auditor = audit.Auditor(sample_rate=0)
+        request = _request(origin="http://foo")
+        session = _session()
+
+        response = requests.send(request, session, auditor=auditor)
+
+        self.assertIs(response, request._response)
+        self.assertEqual(prepare.call_count, 0)
+        self.assertEqual(auditor.skipped, 1)
+
+
+class RevocationTests(unittest.TestCase):
+    def setUp(self):
+        self.session = fake_session(Policy(origins=["http://foo"], version=1))
+        self.cache = cache.PreflightCache()
+
+    def _send(self):
+        request = python_requests.Request(
+            "PUT", "http://api.example.com/items",
+            headers={"Origin": "http://foo", "Content-Type": "application/json"},
+            data="{}").prepare()
+        return requests.send(request, self.session, cache=self.cache)
+
+    def test_revoked_origin_drops_cached_preflight(self):
+        self._send()
+        self.session.server.policies = Policy(origins=["http://bar"], version=2)
+
+        # the preflight cached before the revocation lets one request through,
+        # whose response tells the client the policy changed
+        with self.assertRaises(errors.AccessControlError):
+            self._send()
+        for _ in range(3):
+            with self.assertRaises(errors.AccessControlError):
+                self._send()
+
+        self.assertEqual(self.cache.invalidated, 1)
+        self.assertEqual(self.session.server.methods["PUT"], 2)
+
+
+class Function_send_many_Tests(unittest.TestCase):
+    def setUp(self):
+        self.preflight_response = _response(headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "X-Foo",
+        })
+        self.preflight_response.ok = True
+
+    def _session(self):
+        session = _session()
+        def send_(request, **kwargs):
+            if request.method == "OPTIONS":
+                return self.preflight_response
+            return request._response
+        session.send = mock.MagicMock(wraps=send_)
+        return session
+
+    def _batch_request(self, url="http://example.com/", **kwargs):
+        request = _request(url=url, origin="http://foo", **kwargs)
+        request._response = _response(headers={"Access-Control-Allow-Origin": "*"})
+        request._response.status_code = 200
+        return request
+
+    @mock.patch("requests.Request", wraps=_prepared_request)
+    def test_responses_in_input_order(self, _):
+        batch = [self._batch_request(url="http://example.com/%d" % i) for i in range(8)]
+
+        results = list(requests.send_many(batch, self._session(), max_workers=4))
+
+        self.assertEqual([r[0] for r in results], batch)
+        self.assertEqual([r[1] for r in results], [r._response for r in batch])
+        self.assertEqual([r[2] for r in results], [None] * 8)
+
+    @mock.patch("requests.Request", wraps=_prepared_request)
+    def test_unordered_results(self, _):
+        batch = [self._batch_request(url="http://example.com/%d" % i) for i in range(8)]
+
+        results = requests.send_many(batch, self._session(), ordered=False)
+
+        self.assertEqual(set(r[0] for r in results), set(batch))
+
+    @mock.patch("requests.Request", wraps=_prepared_request)
+    def test_distinct_preflights_sent_once(self, _):
+        batch = [self._batch_request(headers={"X-Foo": "bar"}) for _ in range(8)]
+        session = self._session()
+
+        results = list(requests.send_many(batch, session, max_workers=4))
+
+        methods = [c[0][0].method for c in session.send.call_args_list]
+        self.assertEqual(methods.count("OPTIONS"), 1)
+        self.assertEqual(methods.count("GET"), 8)
+        self.assertEqual([r[2] for r in results], [None] * 8)
+
+    @mock.patch("requests.Request", wraps=_prepared_request)
+    def test_access_control_errors_captured(self, _):
+        allowed = self._batch_request(headers={"X-Foo": "bar"})
+        prohibited = self._batch_request(headers={"X-Bar": "baz"})
+
+        results = list(requests.send_many([prohibited, allowed], self._session()))
+
+        self.assertIsNone(results[0][1])
+        self.assertIsInstance(results[0][2], errors.AccessControlError)
+        self.assertIs(results[1][1], allowed._response)
+        self.assertIsNone(results[1][2])
+
+    @mock.patch("requests.Request", wraps=_prepared_request)
+    def test_failed_checks_negatively_cached(self, _):
+        session = self._session()
+        preflights = cache.PreflightCache(negative_ttl=30)
+        batch = [self._batch_request(headers={"X-Bar": "baz"}) for _ in range(3)]
+
+        results = list(requests.send_many(
+            batch, session, max_workers=1, cache=preflights))
+
+        methods = [c[0][0].method for c in session.send.call_args_list]
+        self.assertEqual(methods, ["OPTIONS"])
+        self.assertEqual(preflights.suppressed, 2)
+        for _, response, error in results:
+            self.assertIsNone(response)
+            self.assertIsInstance(error, errors.AccessControlError)
+
+
+class PartitionedClientTests(unittest.TestCase):
+    def setUp(self):
+        import requests as requests_library
+        self.request = requests_library.Request(
+            "PUT", "http://example.com/items", headers={"X-Foo": "bar"}).prepare()
+        self.sent = []
+        self.session = mock.MagicMock()
+        self.session.send = mock.MagicMock(side_effect=self._send)
+        self.client = requests.PartitionedClient(self.session)
+
+    def _send(self, request, **kwargs):
+        self.sent.append((request.method, request.headers.get("Origin")))
+        response = _response(headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "PUT",
+            "Access-Control-Allow-Headers": "X-Foo",
+        })
+        response.ok = True
+        response.status_code = 200
+        return response
+
+    def test_origin_set_per_call(self):
+        self.client.send(self.request, "http://a.example")
+        self.client.send(self.request, "http://b.example")
+
+        self.assertEqual(
+            [origin for method, origin in self.sent if method == "PUT"],
+            ["http://a.example", "http://b.example"])
+        self.assertNotIn("Origin", self.request.headers)
+
+    def test_preflights_cached_per_origin(self):
+        for origin in ("http://a.example", "http://b.example") * 2:
+            self.client.send(self.request, origin)
+
+        self.assertEqual([m for m, _ in self.sent].count("OPTIONS"), 2)
+        self.assertEqual(len(self.client.cache), 2)
+        self.assertEqual(self.client.cache.backend.origins, 2)
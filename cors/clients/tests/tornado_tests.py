@@ -1,18 +1,26 @@
 import unittest
 
+import mock
+
+from tornado.gen import multi
 from tornado.httpclient import HTTPRequest
 from tornado.testing import AsyncHTTPTestCase, gen_test
 from tornado.web import Application, HTTPError, RequestHandler
 
 from cors import (
+    audit,
+    cache,
     errors,
     preflight,
     utils,
 )
 from cors.clients.tornado import (
+    PreflightLane,
     WrappedClient,
     normalize_request,
 )
+from cors.fakes.tornado import FakeAsyncHTTPClient
+from cors.policy import Policy
 
 
 class Handler(RequestHandler):
@@ -27,6 +35,23 @@ class Handler(RequestHandler):
     delete = head = get = post = put = options = handler
 
 
+class LargeBodyHandler(RequestHandler):
+    def options(self):
+        self.set_header("Access-Control-Allow-Origin", "*")
+
+    def get(self):
+        if self.get_argument("allow", False):
+            self.set_header("Access-Control-Allow-Origin", "*")
+        self.write("x" * 1024 * 1024)
+
+
+class RecordingHandler(Handler):
+    methods = []
+
+    def prepare(self):
+        self.methods.append(self.request.method)
+
+
 class Function_normalize_request_Tests(unittest.TestCase):
     def test_request_as_keyword_arguments(self):
         request = normalize_request("foo", headers={"bar": "baz"})
@@ -49,6 +74,8 @@ class Function_fetch_Tests(AsyncHTTPTestCase):
 
     def get_app(self):
         return Application([
+            (r"/large", LargeBodyHandler),
+            (r"/recorded", RecordingHandler),
             (r"/.*", Handler)
         ])
 
@@ -146,3 +173,278 @@ class Function_fetch_Tests(AsyncHTTPTestCase):
         response = yield self.http_client.fetch(request, raise_error=False)
 
         self.assertEqual(response.code, 502)
+
+    @gen_test
+    def test_disallowed_response_rejected_at_headers(self):
+        lines = []
+        request = HTTPRequest(
+            self.get_url("/large"),
+            headers={
+                "Host": "localhost",
+                "Origin": "http://foo"
+            },
+            header_callback=lines.append,
+            streaming_callback=lambda chunk: self.fail("body was streamed"))
+
+        with self.assertRaises(errors.AccessControlError) as context:
+            yield self.http_client.fetch(request)
+
+        self.assertRegexpMatches(
+            context.exception.message,
+            "Origin '.+' not allowed for resource '.+'")
+        self.assertEqual(lines[-1], "\r\n")
+
+    @gen_test
+    def test_allowed_response_body_buffered(self):
+        request = HTTPRequest(
+            self.get_url("/large?allow=true"),
+            headers={
+                "Host": "localhost",
+                "Origin": "http://foo"
+            })
+
+        response = yield self.http_client.fetch(request)
+
+        self.assertEqual(len(response.body), 1024 * 1024)
+
+    @gen_test
+    def test_audit_records_violations(self):
+        self.http_client = WrappedClient(auditor=audit.Auditor())
+        request = HTTPRequest(
+            url=self.get_url(
+                "/"
+                "?header=Access-Control-Allow-Headers:Bar"
+                "&header=Access-Control-Allow-Origin:*"
+            ),
+            headers={
+                "foo": "bar",
+                "Host": "foo",
+                "Origin": "foo"
+            })
+
+        response = yield self.http_client.fetch(request)
+
+        self.assertEqual(response.code, 200)
+        self.assertNotIsInstance(response.headers, utils.ProtectedHTTPHeaders)
+        self.assertEqual(len(self.http_client.auditor.records), 1)
+        self.assertRegexpMatches(
+            self.http_client.auditor.records[0].message,
+            "Headers set(.*'foo'.*) not allowed")
+
+    @gen_test
+    def test_audit_rejected_origin_recorded(self):
+        self.http_client = WrappedClient(auditor=audit.Auditor())
+        request = HTTPRequest(
+            self.get_url("/large"),
+            headers={
+                "Host": "localhost",
+                "Origin": "http://foo"
+            })
+
+        response = yield self.http_client.fetch(request)
+
+        self.assertEqual(len(response.body), 1024 * 1024)
+        self.assertRegexpMatches(
+            self.http_client.auditor.records[0].message,
+            "Origin '.+' not allowed")
+
+
+class Function_speculative_fetch_Tests(AsyncHTTPTestCase):
+    def setUp(self):
+        super(Function_speculative_fetch_Tests, self).setUp()
+        RecordingHandler.methods = []
+        self.http_client = WrappedClient(speculative=True)
+
+    def get_app(self):
+        return Application([
+            (r"/.*", RecordingHandler)
+        ])
+
+    def _request(self, allowed_headers, method="GET"):
+        return HTTPRequest(
+            self.get_url(
+                "/"
+                "?header=Access-Control-Allow-Origin:*"
+                "&header=Access-Control-Allow-Headers:" + allowed_headers
+            ),
+            method=method,
+            body="" if method == "POST" else None,
+            headers={
+                "X-Foo": "bar",
+                "Host": "foo",
+                "Origin": "foo"
+            })
+
+    @gen_test
+    def test_preflight_and_request_sent_together(self):
+        response = yield self.http_client.fetch(self._request("X-Foo"))
+
+        self.assertEqual(response.code, 200)
+        self.assertEqual(sorted(RecordingHandler.methods), ["GET", "OPTIONS"])
+
+    @gen_test
+    def test_response_discarded_when_checks_fail(self):
+        with self.assertRaises(errors.AccessControlError) as context:
+            yield self.http_client.fetch(self._request("X-Bar"))
+
+        self.assertRegexpMatches(
+            context.exception.message,
+            "Headers set(.*'x-foo'.*) not allowed")
+
+    @gen_test
+    def test_unsafe_methods_wait_for_preflight(self):
+        with self.assertRaises(errors.AccessControlError):
+            yield self.http_client.fetch(self._request("X-Bar", method="POST"))
+
+        self.assertEqual(RecordingHandler.methods, ["OPTIONS"])
+
+    @gen_test
+    def test_not_speculative_by_default(self):
+        self.http_client = WrappedClient()
+
+        with self.assertRaises(errors.AccessControlError):
+            yield self.http_client.fetch(self._request("X-Bar"))
+
+        self.assertEqual(RecordingHandler.methods, ["OPTIONS"])
+
+
+class Function_cached_fetch_Tests(AsyncHTTPTestCase):
+    def setUp(self):
+        super(Function_cached_fetch_Tests, self).setUp()
+        RecordingHandler.methods = []
+        self.cache = cache.PreflightCache()
+        self.http_client = WrappedClient(cache=self.cache)
+
+    def get_app(self):
+        return Application([
+            (r"/.*", RecordingHandler)
+        ])
+
+    def _request(self, allowed_headers="X-Foo"):
+        return HTTPRequest(
+            self.get_url(
+                "/"
+                "?header=Access-Control-Allow-Origin:*"
+                "&header=Access-Control-Allow-Headers:" + allowed_headers
+            ),
+            headers={
+                "X-Foo": "bar",
+                "Host": "foo",
+                "Origin": "foo"
+            })
+
+    @gen_test
+    def test_preflight_reused(self):
+        yield self.http_client.fetch(self._request())
+        yield self.http_client.fetch(self._request())
+
+        self.assertEqual(RecordingHandler.methods, ["OPTIONS", "GET", "GET"])
+        self.assertEqual(len(self.cache), 1)
+
+    @gen_test
+    def test_cached_preflight_still_checked(self):
+        yield self.http_client.fetch(self._request())
+        request = self._request()
+        request.headers["X-Bar"] = "baz"
+
+        with self.assertRaises(errors.AccessControlError):
+            yield self.http_client.fetch(request)
+
+    @gen_test
+    def test_failed_preflight_negatively_cached(self):
+        self.cache.negative_ttl = 30
+        request = self._request()
+        request.url += "&error=true"
+
+        for _ in range(3):
+            with self.assertRaises(errors.AccessControlError) as context:
+                yield self.http_client.fetch(request)
+            self.assertEqual(context.exception.message, "Pre-flight check failed")
+
+        self.assertEqual(RecordingHandler.methods, ["OPTIONS"])
+        self.assertEqual(self.cache.suppressed, 2)
+
+    @gen_test
+    def test_speculative_requests_negatively_cached(self):
+        # the fake server counts requests as they're sent, not once handled
+        fake = FakeAsyncHTTPClient(
+            force_instance=True, policies=Policy(origins=["http://other"]))
+        self.addCleanup(fake.close)
+        self.cache.negative_ttl = 30
+        client = WrappedClient(fake, cache=self.cache, speculative=True)
+        request = HTTPRequest(
+            "http://example.com/", headers={"Origin": "http://foo", "X-Foo": "bar"})
+
+        for _ in range(3):
+            with self.assertRaises(errors.AccessControlError):
+                yield client.fetch(request)
+
+        self.assertEqual(fake.server.methods, {"OPTIONS": 1, "GET": 1})
+        self.assertEqual(self.cache.suppressed, 2)
+
+    @gen_test
+    def test_policy_version_change_drops_origin(self):
+        first = self._request()
+        first.url += "&header=CORS-Policy-Version:1"
+        second = self._request()
+        second.url += "&header=CORS-Policy-Version:2"
+
+        yield self.http_client.fetch(first)
+        yield self.http_client.fetch(second)
+        yield self.http_client.fetch(first)
+
+        self.assertEqual(
+            RecordingHandler.methods,
+            ["OPTIONS", "GET", "OPTIONS", "GET", "OPTIONS", "GET"])
+        self.assertEqual(self.cache.invalidated, 2)
+        self.assertEqual(len(self.cache), 1)
+
+
+class Function_preflight_lane_Tests(AsyncHTTPTestCase):
+    def setUp(self):
+        super(Function_preflight_lane_Tests, self).setUp()
+        RecordingHandler.methods = []
+        self.lane = PreflightLane(slots=1)
+        self.http_client = WrappedClient(preflight_lane=self.lane)
+
+    def tearDown(self):
+        self.lane.client.close()
+        super(Function_preflight_lane_Tests, self).tearDown()
+
+    def get_app(self):
+        return Application([
+            (r"/.*", RecordingHandler)
+        ])
+
+    def _request(self):
+        return HTTPRequest(
+            self.get_url(
+                "/"
+                "?header=Access-Control-Allow-Origin:*"
+                "&header=Access-Control-Allow-Methods:PUT"
+            ),
+            method="PUT",
+            body="",
+            headers={"Host": "foo", "Origin": "foo"})
+
+    @gen_test
+    def test_preflight_sent_through_lane(self):
+        with mock.patch.object(
+                self.lane.client, "fetch", wraps=self.lane.client.fetch) as fetch:
+            response = yield self.http_client.fetch(self._request())
+
+        self.assertEqual(response.code, 200)
+        self.assertEqual(RecordingHandler.methods, ["OPTIONS", "PUT"])
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(fetch.call_args[0][0].method, "OPTIONS")
+        self.assertEqual(self.lane.sent, 1)
+
+    @gen_test
+    def test_queue_stats(self):
+        yield multi([self.http_client.fetch(self._request()) for _ in range(3)])
+
+        self.assertEqual(self.lane.sent, 3)
+        self.assertEqual(self.lane.queued, 0)
+        self.assertEqual(self.lane.max_queued, 2)
+        self.assertGreater(self.lane.max_wait, 0)
+        self.assertLessEqual(self.lane.mean_wait, self.lane.max_wait)
@@ -1,17 +1,34 @@
 from __future__ import absolute_import
 
-from tornado.concurrent import Future
+import time
+from io import BytesIO
+
+from tornado.concurrent import Future, chain_future
 from tornado.gen import coroutine, Return
-from tornado.httpclient import AsyncHTTPClient, HTTPRequest
 
+from cors.cache import CachedPreflight, preflight_key
 from cors.errors import AccessControlError
+from cors.lazy import LazyModule
 from cors.preflight import check_origin, prepare_preflight
 from cors.utils import ProtectedHTTPHeaders
 
 
+httpclient = LazyModule("tornado.httpclient")
+httputil = LazyModule("tornado.httputil")
+locks = LazyModule("tornado.locks")
+
+
+# Methods which may be sent before their preflight has been checked; they must
+# not have side effects on the server.
+SPECULATIVE_METHODS = set([
+    "GET",
+    "HEAD",
+])
+
+
 def normalize_request(request, **kwargs):
-    if not isinstance(request, HTTPRequest):
-        request = HTTPRequest(url=request, **kwargs)
+    if not isinstance(request, httpclient.HTTPRequest):
+        request = httpclient.HTTPRequest(url=request, **kwargs)
     return request
 
 
@@ -21,53 +38,329 @@ def safe_fetch(fetch, request):
     return future
 
 
+class HeaderPhaseCheck(object):
+    """
+    Check the origin of a response as soon as its headers arrive.
+
+    Installed as the request's `header_callback` and `streaming_callback`; the
+    body of a rejected response is discarded as it arrives rather than being
+    buffered, and `rejected` resolves with the error without waiting for the
+    transfer to finish. The body of an accepted response is buffered, or passed
+    on to the request's own streaming callback if it had one.
+
+    Given an auditor, a failed check is recorded with it and the response is
+    accepted.
+
+    """
+    def __init__(self, request, skip_checks_on_server_error=False, auditor=None):
+        self.request = request
+        self.skip_checks_on_server_error = skip_checks_on_server_error
+        self.auditor = auditor
+        self.header_callback = request.header_callback
+        self.streaming_callback = request.streaming_callback
+        self.checked = False
+        self.error = None
+        self.code = None
+        self.headers = httputil.HTTPHeaders()
+        self.buffer = BytesIO()
+        self.rejected = Future()
+
+    def install(self):
+        self.request.header_callback = self.on_header
+        self.request.streaming_callback = self.on_chunk
+
+    def uninstall(self):
+        self.request.header_callback = self.header_callback
+        self.request.streaming_callback = self.streaming_callback
+
+    def on_header(self, line):
+        if callable(self.header_callback):
+            self.header_callback(line)
+
+        if line.startswith("HTTP/"):
+            # a new response; eg. after a 100 Continue
+            self.code = httputil.parse_response_start_line(line).code
+            self.headers = httputil.HTTPHeaders()
+        elif line.strip():
+            self.headers.parse_line(line)
+        else:
+            self.check()
+
+    def on_chunk(self, chunk):
+        if self.error is not None:
+            return
+        elif callable(self.streaming_callback):
+            self.streaming_callback(chunk)
+        else:
+            self.buffer.write(chunk)
+
+    def check(self):
+        self.checked = True
+        if self.code / 100 == 5 and self.skip_checks_on_server_error:
+            return
+        try:
+            check_origin(self, self.request)
+        except AccessControlError as e:
+            if self.auditor is not None:
+                self.auditor.record(e)
+                return
+            self.error = e
+            self.rejected.set_exception(e)
+
+    def buffered(self, response):
+        """
+        Restore the body of a response which was streamed to us.
+
+        """
+        if callable(self.streaming_callback):
+            return response
+        self.buffer.seek(0)
+        return httpclient.HTTPResponse(
+            response.request,
+            response.code,
+            headers=response.headers,
+            buffer=self.buffer,
+            effective_url=response.effective_url,
+            error=response.error,
+            request_time=response.request_time,
+            time_info=response.time_info,
+            reason=response.reason)
+
+
+def first_of(*futures):
+    """
+    Resolve with the outcome of whichever future resolves first.
+
+    """
+    first = Future()
+    def resolve(future):
+        if not first.done():
+            chain_future(future, first)
+    for future in futures:
+        future.add_done_callback(resolve)
+    return first
+
+
+def discard(future):
+    """
+    Drop a future's outcome without having its exception logged.
+
+    """
+    future.add_done_callback(lambda f: f.exception())
+
+
+class PreflightLane(object):
+    """
+    Send preflights through their own small client so they never queue behind
+    large actual requests when the main client's max_clients are all in use.
+
+    At most slots preflights are in flight at once; the rest wait their turn.
+    `queued` is how many are waiting now and `max_queued` the most that ever
+    were, and waits are in seconds.
+
+    """
+    def __init__(self, client=None, slots=4):
+        self.client = client or httpclient.AsyncHTTPClient(force_instance=True, max_clients=slots)
+        self.slots = slots
+        self.queued = 0
+        self.max_queued = 0
+        self.sent = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._slots = locks.Semaphore(slots)
+
+    @property
+    def mean_wait(self):
+        return self.total_wait / self.sent if self.sent else 0.0
+
+    def fetch(self, request, callback=None):
+        future = self._fetch(request)
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(f.result()))
+        return future
+
+    @coroutine
+    def _fetch(self, request):
+        start = time.time()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            slot = yield self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        with slot:
+            wait = time.time() - start
+            self.sent += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            response = yield safe_fetch(self.client.fetch, request)
+        raise Return(response)
+
+
 class WrappedClient(object):
-    def __init__(self, client=None):
-        client = client or AsyncHTTPClient()
+    def __init__(self, client=None, speculative=False, cache=None, auditor=None,
+                 preflight_lane=None):
+        client = client or httpclient.AsyncHTTPClient()
         self.client = client
+        self.speculative = speculative
+        self.cache = cache
+        self.auditor = auditor
+        self.preflight_lane = preflight_lane
 
     def __getattr__(self, attr):
         return getattr(self.client, attr)
 
     def fetch(self, *args, **kwargs):
+        kwargs.setdefault("speculative", self.speculative)
+        kwargs.setdefault("cache", self.cache)
+        kwargs.setdefault("auditor", self.auditor)
+        kwargs.setdefault("preflight_lane", self.preflight_lane)
         return cors_enforced_fetch(self.client, *args, **kwargs)
 
 
 @coroutine
-def cors_enforced_fetch(client, request, callback=None, **kwargs):
-    request = normalize_request(request, **kwargs)
-    preflight, checks = prepare_preflight(request)
+def check_preflight(client, preflight, checks, request, cache=None):
+    """
+    Fetch the preflight for a request, or reuse a cached response, and check
+    that it allows the request.
 
-    if preflight is not None:
-        preflight = HTTPRequest(
-            preflight.url,
-            preflight.method,
-            preflight.headers)
+    """
+    key = preflight_key(preflight, request)
+    response = cache.lookup(key) if cache is not None else None
 
-        response = yield safe_fetch(client.fetch, preflight)
-        if response.error:
-            raise AccessControlError(
-                "Pre-flight check failed",
-                preflight.url,
-                preflight.method,
-                preflight.headers)
+    try:
+        if response is None:
+            response = yield fetch_preflight(client, preflight)
+            if cache is not None:
+                cache.observe_response(request, response)
+                cache.set(key, CachedPreflight.from_response(response))
 
         # check that the preflight response says its ok to send our followup.
         # below check again that the preflight grants access to the response.
         for check in checks:
             check(response, request)
+    except AccessControlError as e:
+        if cache is not None:
+            cache.reject(key, e)
+        raise
+
+
+@coroutine
+def fetch_preflight(client, preflight):
+    preflight = httpclient.HTTPRequest(
+        preflight.url,
+        preflight.method,
+        preflight.headers)
+
+    response = yield safe_fetch(client.fetch, preflight)
+    if response.error:
+        raise AccessControlError(
+            "Pre-flight check failed",
+            preflight.url,
+            preflight.method,
+            preflight.headers)
+    raise Return(response)
+
+
+@coroutine
+def fetch_actual(client, request, skip_checks_on_server_error=False, auditor=None):
+    """
+    Fetch an actual request and check that its response is allowed.
+
+    The check is done as soon as the headers arrive so that we don't wait
+    around for the body of a response we aren't allowed to read.
+
+    """
+    header_check = HeaderPhaseCheck(request, skip_checks_on_server_error, auditor)
+    header_check.install()
+    fetched = safe_fetch(client.fetch, request)
+    # a rejected response is still being transferred; keep dropping its body
+    fetched.add_done_callback(lambda _: header_check.uninstall())
+    response = yield first_of(fetched, header_check.rejected)
 
-    response = yield safe_fetch(client.fetch, request)
+    # clients which don't support header callbacks are checked after the fact
+    if header_check.checked:
+        response = header_check.buffered(response)
+    elif response.code / 100 != 5 or not skip_checks_on_server_error:
+        try:
+            check_origin(response, request)
+        except AccessControlError as e:
+            if auditor is None:
+                raise
+            auditor.record(e)
+
+    raise Return(response)
+
+
+@coroutine
+def cors_enforced_fetch(client, request, callback=None, speculative=False, cache=None, auditor=None, preflight_lane=None, **kwargs):
+    """
+    Fetch a request adhering to same-origin policy rules.
+
+    Passing a `cors.cache.PreflightCache` as cache lets preflight responses be
+    reused by subsequent requests until they expire.
+
+    Passing a `cors.audit.Auditor` as auditor records violations with it
+    instead of raising them, for the requests it samples. Requests it doesn't
+    sample are fetched as they are.
+
+    With speculative set, GET and HEAD requests needing a preflight are sent
+    alongside it rather than after it. Their response is only released once
+    the preflight checks pass and is discarded otherwise.
+
+    Passing a `PreflightLane` as preflight_lane sends preflights through it
+    instead of client.
+
+    """
+    request = normalize_request(request, **kwargs)
+    if auditor is not None and not auditor.sample():
+        response = yield safe_fetch(client.fetch, request)
+        if not callable(callback):
+            raise Return(response)
+        callback(response)
+        return
+
+    preflight, checks = prepare_preflight(request)
 
     # double-check that the actual response included appropriate headers as well
     # skip checks in the case of a server error unless configured otherwise.
     skip_checks = getattr(client, "skip_checks_on_server_error", False)
-    if response.code / 100 != 5 or not skip_checks:
-        check_origin(response, request)
 
-    # wrap the headers in a protective layer
-    exposed = response.headers.get("Access-Control-Expose-Headers", "")
-    response.headers = ProtectedHTTPHeaders(exposed, response.headers)
+    actual = None
+    if (speculative
+            and preflight is not None
+            and request.method.upper() in SPECULATIVE_METHODS
+            # nothing is gained by speculating with a cached preflight, and
+            # nothing may be sent for one known to have failed
+            and (cache is None or cache.get(preflight_key(preflight, request)) is None)):
+        actual = fetch_actual(client, request, skip_checks, auditor)
+
+    if preflight is not None:
+        try:
+            yield check_preflight(
+                preflight_lane or client, preflight, checks, request, cache)
+        except AccessControlError as e:
+            if auditor is None:
+                if actual is not None:
+                    discard(actual)
+                raise
+            auditor.record(e)
+        except Exception:
+            if actual is not None:
+                discard(actual)
+            raise
+
+    if actual is None:
+        actual = fetch_actual(client, request, skip_checks, auditor)
+    response = yield actual
+    if cache is not None:
+        cache.observe_response(request, response)
+
+    # wrap the headers in a protective layer, unless we're only auditing
+    if auditor is None:
+        exposed = response.headers.get("Access-Control-Expose-Headers", "")
+        response.headers = ProtectedHTTPHeaders(exposed, response.headers)
 
     if not callable(callback):
         raise Return(response)
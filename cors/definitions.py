@@ -1,12 +1,19 @@
 import re
-import urlparse
 
+from cors.lazy import LazyModule
+
+
+urlparse = LazyModule("urlparse")
 
 CORS_REQUEST_HEADERS = set([
     "access-control-request-method",
     "access-control-request-headers",
 ])
 
+# Carries the version of the server's policy so that clients caching preflights
+# can tell when it changes.
+POLICY_VERSION_HEADER = "CORS-Policy-Version"
+
 CORS_RESPONSE_HEADERS = set([
     "access-control-allow-origin",
     "access-control-allow-methods",
@@ -52,15 +59,30 @@ SIMPLE_REQUEST_CONTENT_TYPES = set([
     "text/plain",
 ])
 
+# Headers a request may carry without needing to be allowed by a preflight.
+IMPLICIT_REQUEST_HEADERS = frozenset(
+    SIMPLE_AUTHOR_HEADERS | SIMPLE_AGENT_HEADERS | CORS_REQUEST_HEADERS)
+
+# Response headers which scripts may always read.
+READABLE_RESPONSE_HEADERS = frozenset(
+    SIMPLE_RESPONSE_HEADERS | CORS_RESPONSE_HEADERS)
+
+_port_pattern = None
+
 def _normalize_list(list_):
     if isinstance(list_, basestring):
         list_ = [v.strip() for v in list_.split(",")]
     return [v.lower() for v in list_]
 
 def _normalize_origin_url(origin):
+    # the pattern is only compiled once an origin needs checking
+    global _port_pattern
+    if _port_pattern is None:
+        _port_pattern = re.compile(r":\d+$")
+
     origin_parts = urlparse.urlparse(origin)
     origin = [origin_parts.scheme, "://", origin_parts.netloc]
-    if not re.search(":\d+$", origin_parts.netloc):
+    if not _port_pattern.search(origin_parts.netloc):
         origin.append(":443" if origin_parts.scheme == "https" else ":80")
     return "".join(origin)
 
@@ -87,7 +109,6 @@ def is_simple_content_type(request):
     )
 
 def get_prohibited_headers(request, allowed):
-    requested = set(map(str.lower, request.headers.keys()))
-    implicit = (SIMPLE_AUTHOR_HEADERS | SIMPLE_AGENT_HEADERS | CORS_REQUEST_HEADERS)
+    requested = set(h.lower() for h in request.headers.keys())
     allowed = set(_normalize_list(allowed))
-    return requested - implicit - allowed
+    return requested - IMPLICIT_REQUEST_HEADERS - allowed
@@ -2,9 +2,33 @@ class CORSError(Exception):
     """Base class for CORS-related errors."""
 
 class AccessControlError(CORSError):
-    """Raised when access to the requested resource is not permitted."""
-    def __init__(self, message, url=None, method=None, headers=None):
+    """
+    Raised when access to the requested resource is not permitted.
+
+    When format_args are given the message is only formatted with them once
+    it is read, so errors which are recorded rather than shown stay cheap.
+
+    """
+    def __init__(self, message, url=None, method=None, headers=None, format_args=None):
         super(AccessControlError, self).__init__(message)
         self.url = url
         self.method = method
         self.headers = headers
+        self.format_args = format_args
+
+    @property
+    def message(self):
+        if self.format_args is None:
+            return self.args[0]
+        return self.args[0] % self.format_args
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, self.message)
+
+    def __reduce__(self):
+        # args only holds the unformatted message; keep everything else too
+        return (type(self), (
+            self.args[0], self.url, self.method, self.headers, self.format_args))
@@ -0,0 +1,57 @@
+"""
+In-process stand-ins for CORS enforcing servers.
+
+`FakeServer` answers requests from a `cors.policy.Policy` or
+`cors.routes.PolicyRegistry` without any sockets; `cors.fakes.requests` and
+`cors.fakes.tornado` plug it into each HTTP library's transport so that the
+clients can be tested and benchmarked in isolation.
+
+"""
+from collections import Counter
+
+from cors.lazy import LazyModule
+
+
+urlparse = LazyModule("urlparse")
+
+
+class FakeServer(object):
+    """
+    Canned responses with the CORS headers policies say they should have.
+
+    Preflights, OPTIONS requests with an Access-Control-Request-Method, are
+    answered with a 204 and the policy's preflight headers. Anything else gets
+    the response given for its URL in responses, as a (code, headers, body)
+    tuple, or an empty 200, with the policy's actual response headers added.
+
+    """
+    def __init__(self, policies, responses=None):
+        self.policies = policies
+        self.responses = dict(responses or {})
+        self.methods = Counter()
+
+    def policy_for(self, url):
+        policy_for = getattr(self.policies, "policy_for", None)
+        if policy_for is None:
+            return self.policies
+        return policy_for(urlparse.urlparse(url).path)
+
+    def respond(self, method, url, headers):
+        """
+        The (code, headers, body) a request is answered with.
+
+        """
+        self.methods[method] += 1
+        policy = self.policy_for(url)
+        lowered = dict((name.lower(), value) for name, value in headers.items())
+
+        if method == "OPTIONS" and "access-control-request-method" in lowered:
+            if policy is None:
+                return 204, {}, b""
+            return 204, policy.preflight_response_headers(headers), b""
+
+        code, response_headers, body = self.responses.get(url, (200, {}, b""))
+        if policy is not None:
+            response_headers = policy.actual_response_headers(
+                response_headers, lowered.get("origin"))
+        return code, response_headers, body
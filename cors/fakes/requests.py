@@ -0,0 +1,47 @@
+from __future__ import absolute_import
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.sessions import Session
+from requests.structures import CaseInsensitiveDict
+
+from cors.fakes import FakeServer
+
+
+class FakeAdapter(BaseAdapter):
+    """
+    A transport adapter answering every request from a `FakeServer`.
+
+    """
+    def __init__(self, server):
+        super(FakeAdapter, self).__init__()
+        self.server = server
+
+    def send(self, request, **kwargs):
+        code, headers, body = self.server.respond(
+            request.method, request.url, request.headers)
+        response = Response()
+        response.status_code = code
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def fake_session(policies, responses=None):
+    """
+    A session whose requests are all answered in process by a `FakeServer`,
+    which is kept as its server attribute.
+
+    """
+    session = Session()
+    adapter = FakeAdapter(FakeServer(policies, responses))
+    session.server = adapter.server
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
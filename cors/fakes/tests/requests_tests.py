@@ -0,0 +1,49 @@
+from __future__ import absolute_import
+
+import unittest
+
+import requests
+
+from cors.clients.requests import send
+from cors.errors import AccessControlError
+from cors.fakes.requests import fake_session
+from cors.policy import Policy
+from cors.routes import PolicyRegistry
+
+
+class FakeSessionTests(unittest.TestCase):
+    def setUp(self):
+        self.session = fake_session(
+            PolicyRegistry({
+                "/open": Policy(methods=["GET", "PUT"], headers=["Content-Type"]),
+                "/closed": Policy(origins=["http://other"]),
+            }),
+            {"http://example.com/open/body": (200, {"X-Foo": "bar"}, b"hello")})
+        self.server = self.session.server
+
+    def _request(self, path, method="PUT"):
+        return requests.Request(
+            method,
+            "http://example.com" + path,
+            headers={"Origin": "http://foo", "Content-Type": "application/json"},
+            data="{}").prepare()
+
+    def test_allowed(self):
+        response = send(self._request("/open/body"), self.session)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"hello")
+        self.assertEqual(response.headers["X-Foo"], "bar")
+        self.assertEqual(self.server.methods["OPTIONS"], 1)
+        self.assertEqual(self.server.methods["PUT"], 1)
+
+    def test_rejected(self):
+        with self.assertRaises(AccessControlError):
+            send(self._request("/closed"), self.session)
+
+        self.assertEqual(self.server.methods["PUT"], 0)
+
+    def test_plain_request(self):
+        response = self.session.get("http://example.com/open", headers={"Origin": "http://foo"})
+
+        self.assertEqual(response.headers["Access-Control-Allow-Origin"], "*")
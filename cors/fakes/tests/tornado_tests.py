@@ -0,0 +1,48 @@
+from tornado.httpclient import HTTPRequest
+from tornado.testing import AsyncTestCase, gen_test
+
+from cors.clients.tornado import WrappedClient
+from cors.errors import AccessControlError
+from cors.fakes.tornado import FakeAsyncHTTPClient
+from cors.policy import Policy
+
+
+class FakeAsyncHTTPClientTests(AsyncTestCase):
+    def setUp(self):
+        super(FakeAsyncHTTPClientTests, self).setUp()
+        self.fake = FakeAsyncHTTPClient(
+            force_instance=True,
+            policies=Policy(origins=["http://foo"], methods=["GET", "PUT"]),
+            responses={"http://example.com/body": (200, {}, b"hello")})
+        self.client = WrappedClient(self.fake)
+
+    def tearDown(self):
+        self.fake.close()
+        super(FakeAsyncHTTPClientTests, self).tearDown()
+
+    def _request(self, origin="http://foo"):
+        return HTTPRequest(
+            "http://example.com/body", "PUT", body="{}",
+            headers={"Origin": origin, "Content-Type": "text/plain"})
+
+    @gen_test
+    def test_allowed(self):
+        response = yield self.client.fetch(self._request())
+
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.body, b"hello")
+        self.assertEqual(self.fake.server.methods["OPTIONS"], 1)
+
+    @gen_test
+    def test_rejected(self):
+        with self.assertRaises(AccessControlError):
+            yield self.client.fetch(self._request(origin="http://bar"))
+
+        self.assertEqual(self.fake.server.methods["PUT"], 0)
+
+    @gen_test
+    def test_plain_fetch(self):
+        response = yield self.fake.fetch("http://example.com/other", headers={"Origin": "http://foo"})
+
+        self.assertEqual(response.headers["Access-Control-Allow-Origin"], "http://foo")
+        self.assertEqual(response.body, b"")
@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+
+from io import BytesIO
+
+from tornado.httpclient import AsyncHTTPClient, HTTPResponse
+from tornado.httputil import HTTPHeaders, responses
+
+from cors.fakes import FakeServer
+
+
+class FakeAsyncHTTPClient(AsyncHTTPClient):
+    """
+    An `AsyncHTTPClient` whose requests are all answered in process.
+
+        client = FakeAsyncHTTPClient(force_instance=True, policies=policy)
+
+    Requests with a header_callback or streaming_callback have them called
+    just as a real client would.
+
+    """
+    def initialize(self, defaults=None, policies=None, responses=None,
+                   server=None, **kwargs):
+        # io_loop, which Tornado 5 no longer takes, is passed on only if given
+        super(FakeAsyncHTTPClient, self).initialize(defaults=defaults, **kwargs)
+        self.server = server or FakeServer(policies, responses)
+
+    def fetch_impl(self, request, callback):
+        code, headers, body = self.server.respond(
+            request.method, request.url, request.headers)
+        headers = HTTPHeaders(headers)
+
+        if request.header_callback is not None:
+            request.header_callback(
+                "HTTP/1.1 %d %s\r\n" % (code, responses.get(code, "Unknown")))
+            for name, value in headers.get_all():
+                request.header_callback("%s: %s\r\n" % (name, value))
+            request.header_callback("\r\n")
+
+        buffer = BytesIO()
+        if request.streaming_callback is not None:
+            if body:
+                request.streaming_callback(body)
+        else:
+            buffer = BytesIO(body)
+
+        callback(HTTPResponse(request, code, headers=headers, buffer=buffer))
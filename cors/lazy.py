@@ -0,0 +1,38 @@
+"""
+Modules which are only imported once something is looked up on them.
+
+    urlparse = LazyModule("urlparse")
+
+    def host(url):
+        return urlparse.urlparse(url).netloc
+
+Hot paths use these in place of an `import` statement inside the function,
+which goes through the import machinery on every call.
+
+"""
+import importlib
+
+
+class LazyModule(object):
+    """
+    Stands in for the module name, importing it on first attribute lookup.
+
+    Only the module is kept; attributes are looked up on it each time so that
+    whatever patches or reloads replace them are seen.
+
+    """
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return "<LazyModule %r%s>" % (
+            self._name, "" if self._module is None else " (loaded)")
@@ -0,0 +1,151 @@
+from cors.definitions import (
+    SIMPLE_REQUEST_CONTENT_TYPES,
+    is_same_origin,
+    is_simple_content_type,
+)
+from cors.preflight import (
+    check_headers,
+    check_method,
+    check_origin,
+    prepare_preflight,
+    share_checks,
+)
+from cors.utils import HeadersDict, Request, intern_header_names
+
+
+CHECKS = dict((check.__name__, check) for check in (
+    check_origin,
+    check_method,
+    check_headers,
+))
+
+
+class PreflightPlan(object):
+    """
+    The preflight headers, less Host and Origin, and the followup checks which
+    `prepare_preflight` decided on for a shape of request.
+
+    """
+    __slots__ = ("headers", "checks")
+
+    def __init__(self, headers, checks):
+        set_ = super(PreflightPlan, self).__setattr__
+        set_("headers", tuple(sorted(dict(headers).items())))
+        set_("checks", share_checks(checks))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PreflightPlan objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("PreflightPlan objects are immutable")
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, PreflightPlan)
+            and self.headers == other.headers
+            and self.checks == other.checks)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.headers, self.checks))
+
+    def compiled(self):
+        """
+        The plan as plain, marshallable data.
+
+        """
+        return self.headers, tuple(check.__name__ for check in self.checks)
+
+    @classmethod
+    def from_compiled(cls, compiled):
+        headers, check_names = compiled
+        return cls(headers, [CHECKS[name] for name in check_names])
+
+
+def get_request_shape(request):
+    """
+    Reduce a request to the parts which decide what preflight it needs.
+
+    """
+    headers = request.headers
+    return (
+        request.method,
+        is_same_origin(request),
+        intern_header_names(headers.keys()),
+        is_simple_content_type(request),
+        headers.get("Content-Type", "text/plain") in SIMPLE_REQUEST_CONTENT_TYPES,
+    )
+
+def compile_plan(request):
+    """
+    Record what `prepare_preflight` decides for a request as a `PreflightPlan`,
+    or None when no preflight is needed.
+
+    """
+    preflight, checks = prepare_preflight(request)
+    if preflight is None:
+        return None
+    headers = dict(preflight.headers)
+    headers.pop("Host", None)
+    headers.pop("Origin", None)
+    return PreflightPlan(headers, checks)
+
+
+class PlanTable(object):
+    """
+    A table of preflight plans by request shape.
+
+    `prepare_preflight` looks a request's plan up rather than working it out,
+    compiling and adding plans for shapes which aren't in the table yet.
+
+    """
+    def __init__(self, plans=None):
+        self.plans = dict(plans or {})
+
+    @classmethod
+    def from_compiled(cls, compiled):
+        return cls(
+            (shape, PreflightPlan.from_compiled(plan) if plan is not None else None)
+            for shape, plan in compiled.items())
+
+    def compiled(self):
+        """
+        The table as plain, marshallable data.
+
+        """
+        return dict(
+            (shape, plan.compiled() if plan is not None else None)
+            for shape, plan in self.plans.items())
+
+    @classmethod
+    def from_requests(cls, requests):
+        table = cls()
+        for request in requests:
+            table.plan(request)
+        return table
+
+    def plan(self, request):
+        shape = get_request_shape(request)
+        try:
+            return self.plans[shape]
+        except KeyError:
+            plan = self.plans[shape] = compile_plan(request)
+            return plan
+
+    def prepare_preflight(self, request):
+        plan = self.plan(request)
+        if plan is None:
+            return None, ()
+
+        request_headers = HeadersDict(request.headers)
+        headers = dict(plan.headers)
+        headers["Host"] = request_headers.get("host", "")
+        if "origin" in request_headers:
+            headers["Origin"] = request_headers["origin"]
+        preflight = Request("OPTIONS", request.url, headers)
+        return preflight, plan.checks
+
+    def __len__(self):
+        return len(self.plans)
@@ -0,0 +1,254 @@
+import re
+
+from cors.definitions import (
+    CORS_RESPONSE_HEADERS,
+    POLICY_VERSION_HEADER,
+    _normalize_list,
+)
+from cors.preflight import (
+    generate_acceptable_actual_response_headers,
+    generate_acceptable_preflight_response_headers,
+)
+from cors.utils import HeaderBlock, HeadersDict, intern_header_names
+
+
+# How many encoded header blocks a policy keeps before starting over.
+MAX_HEADER_BLOCKS = 4096
+
+
+def _headers(headers):
+    normalized = HeadersDict()
+    for name, value in headers.items():
+        normalized[name] = value
+    return normalized
+
+def _add_vary(response, name):
+    # keep whatever the response already varies on
+    for key, value in response.items():
+        if key.lower() == "vary":
+            fields = [field.strip().lower() for field in value.split(",")]
+            if name.lower() not in fields and "*" not in fields:
+                response[key] = "%s, %s" % (value, name) if value.strip() else name
+            return
+    response["Vary"] = name
+
+def _origin_pattern(origin):
+    return ".*?".join(re.escape(part) for part in origin.split("*"))
+
+
+class Policy(object):
+    """
+    A server's rules for which cross origin requests it allows.
+
+    origins is either "*" or a list of allowed origins, where a "*" within an
+    origin matches anything, eg. "https://*.example.com". methods and headers
+    list what preflights may ask for and default to whatever is requested.
+    expose_headers lists the response headers scripts may read and defaults to
+    all of them.
+
+    A policy with a version sends it in a CORS-Policy-Version header, letting
+    clients which cache preflights drop them as soon as the policy changes.
+
+    """
+    def __init__(self, origins="*", methods=None, headers=None,
+                 expose_headers=None, max_age=None, credentials=False,
+                 version=None):
+        self.any_origin = origins == "*"
+        self.exact_origins = frozenset()
+        self.origin_patterns = ()
+        if not self.any_origin:
+            origins = _normalize_list(origins)
+            self.exact_origins = frozenset(o for o in origins if "*" not in o)
+            self.origin_patterns = tuple(
+                _origin_pattern(o) for o in origins if "*" in o)
+
+        self.methods = None
+        if methods is not None:
+            self.methods = frozenset(m.upper() for m in _normalize_list(methods))
+        self.headers = None
+        if headers is not None:
+            self.headers = frozenset(_normalize_list(headers))
+        self.expose_headers = None
+        if expose_headers is not None:
+            self.expose_headers = tuple(_normalize_list(expose_headers))
+        self.max_age = max_age
+        self.credentials = credentials
+        self.version = None if version is None else str(version)
+        self._origin_regex = None
+        self._blocks = {}
+
+    @property
+    def origin_regex(self):
+        # compiled on first use so policies loaded from a snapshot start fast
+        if self._origin_regex is None and self.origin_patterns:
+            self._origin_regex = re.compile(
+                "(?:%s)$" % "|".join(self.origin_patterns))
+        return self._origin_regex
+
+    def allows_origin(self, origin):
+        if self.any_origin:
+            return True
+        if origin is None:
+            return False
+        origin = origin.lower()
+        if origin in self.exact_origins:
+            return True
+        return self.origin_regex is not None and bool(self.origin_regex.match(origin))
+
+    def allowed_origin(self, origin):
+        """
+        The Access-Control-Allow-Origin value to send to origin.
+
+        """
+        if self.any_origin and not self.credentials:
+            return "*"
+        return origin
+
+    def preflight_response_headers(self, requested):
+        """
+        Given preflight request headers generate the CORS response headers.
+
+        A preflight from an origin the policy doesn't allow gets no CORS
+        headers at all, only the policy's version if it has one, so that
+        clients still holding preflights from before it was refused drop them.
+
+        """
+        requested = _headers(requested)
+        origin = requested.get("Origin")
+        if not self.allows_origin(origin):
+            return self._refused_headers()
+
+        response = generate_acceptable_preflight_response_headers(
+            requested, self.max_age)
+        response["Access-Control-Allow-Origin"] = self.allowed_origin(origin)
+        if self.methods is not None and "Access-Control-Allow-Methods" in response:
+            response["Access-Control-Allow-Methods"] = ",".join(sorted(self.methods))
+        if self.headers is not None and "Access-Control-Allow-Headers" in response:
+            response["Access-Control-Allow-Headers"] = ",".join(
+                HeadersDict.normalize(h) for h in sorted(self.headers))
+        self._add_common_headers(response)
+        return response
+
+    def actual_response_headers(self, response, origin):
+        """
+        Given the headers from an actual response add the CORS response headers.
+
+        """
+        if not self.allows_origin(origin):
+            response = dict(response)
+            response.update(self._refused_headers())
+            return response
+
+        response = generate_acceptable_actual_response_headers(dict(response), origin)
+        response["Access-Control-Allow-Origin"] = self.allowed_origin(origin)
+        if self.expose_headers is not None:
+            response["Access-Control-Expose-Headers"] = ",".join(
+                HeadersDict.normalize(h) for h in self.expose_headers)
+        self._add_common_headers(response)
+        return response
+
+    def preflight_header_block(self, requested):
+        """
+        `preflight_response_headers` as a `HeaderBlock`.
+
+        Blocks are encoded once for each class of origin, by the value of
+        Access-Control-Allow-Origin sent to it, and whatever else the policy
+        echoes back from the preflight.
+
+        """
+        requested = _headers(requested)
+        origin = requested.get("Origin")
+        if not self.allows_origin(origin):
+            return self._refused_block()
+
+        method = requested.get("Access-Control-Request-Method")
+        headers = requested.get("Access-Control-Request-Headers")
+        key = (
+            "preflight",
+            self.allowed_origin(origin),
+            method if self.methods is None else method is not None,
+            headers if self.headers is None else headers is not None,
+        )
+        return self._block(key, self.preflight_response_headers, requested)
+
+    def actual_header_block(self, origin, header_names=()):
+        """
+        The CORS headers `actual_response_headers` adds as a `HeaderBlock`.
+
+        header_names are the names of the response's own headers, which only
+        matter when the policy doesn't list the headers to expose.
+
+        """
+        if not self.allows_origin(origin):
+            return self._refused_block()
+
+        if self.expose_headers is not None:
+            header_names = ()
+        key = ("actual", self.allowed_origin(origin), intern_header_names(header_names))
+        return self._block(key, self._actual_cors_headers, header_names, origin)
+
+    def _actual_cors_headers(self, header_names, origin):
+        response = self.actual_response_headers(dict.fromkeys(header_names, ""), origin)
+        return dict(
+            (name, value) for name, value in response.items()
+            if name.lower() in CORS_RESPONSE_HEADERS
+            or (name in ("Vary", POLICY_VERSION_HEADER) and value))
+
+    def _refused_headers(self):
+        if self.version is None:
+            return {}
+        return {POLICY_VERSION_HEADER: self.version}
+
+    def _refused_block(self):
+        if self.version is None:
+            return _EMPTY_BLOCK
+        return self._block(("refused",), self._refused_headers)
+
+    def _block(self, key, generate, *args):
+        try:
+            return self._blocks[key]
+        except KeyError:
+            if len(self._blocks) >= MAX_HEADER_BLOCKS:
+                self._blocks = {}
+            block = self._blocks[key] = HeaderBlock(generate(*args))
+            return block
+
+    def _add_common_headers(self, response):
+        if self.credentials:
+            response["Access-Control-Allow-Credentials"] = "true"
+        if self.version is not None:
+            response[POLICY_VERSION_HEADER] = self.version
+        if response["Access-Control-Allow-Origin"] != "*":
+            _add_vary(response, "Origin")
+
+    def compiled(self):
+        """
+        The policy's compiled state as plain, marshallable data.
+
+        """
+        return {
+            "any_origin": self.any_origin,
+            "exact_origins": self.exact_origins,
+            "origin_patterns": self.origin_patterns,
+            "methods": self.methods,
+            "headers": self.headers,
+            "expose_headers": self.expose_headers,
+            "max_age": self.max_age,
+            "credentials": self.credentials,
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_compiled(cls, state):
+        """
+        Recreate a policy from `compiled` state without compiling it again.
+
+        """
+        policy = cls.__new__(cls)
+        policy.__dict__.update(state)
+        policy._origin_regex = None
+        policy._blocks = {}
+        return policy
+
+
+_EMPTY_BLOCK = HeaderBlock({})
@@ -14,8 +14,18 @@ from cors.utils import (
     Request,
 )
 
+_check_sequences = {}
+
+def share_checks(checks):
+    """
+    Return checks as a tuple shared with every equal sequence of checks.
+
+    """
+    checks = tuple(checks)
+    return _check_sequences.setdefault(checks, checks)
+
 def format_header_field(header):
-    return "-".join(map(str.capitalize, header.split("-")))
+    return "-".join(part.capitalize() for part in header.split("-"))
 
 def check_origin(response, prepared_request):
     """
@@ -30,10 +40,11 @@ def check_origin(response, prepared_request):
     origin = headers["origin"]
     if response.headers.get("Access-Control-Allow-Origin") not in ("*", origin):
         raise AccessControlError(
-            "Origin %r not allowed for resource %r" % (origin, request.url),
+            "Origin %r not allowed for resource %r",
             request.url,
             request.method,
-            request.headers)
+            request.headers,
+            format_args=(origin, request.url))
 
 def check_method(response, prepared_request):
     """
@@ -59,10 +70,11 @@ def check_method(response, prepared_request):
 
     if request.method.upper() not in allowed_methods:
         raise AccessControlError(
-            "Method %r not allowed for resource %r" % (request.method, request.url),
+            "Method %r not allowed for resource %r",
             request.url,
             request.method,
-            request.headers)
+            request.headers,
+            format_args=(request.method, request.url))
 
 def check_headers(response, prepared_request):
     """
@@ -80,10 +92,11 @@ def check_headers(response, prepared_request):
         return
 
     raise AccessControlError(
-        "Headers %r not allowed for resource %r" % (prohibited, request.url),
+        "Headers %r not allowed for resource %r",
         request.url,
         request.method,
-        request.headers)
+        request.headers,
+        format_args=(prohibited, request.url))
 
 def prepare_preflight_allowed_origin(request):
     if is_same_origin(request):
@@ -128,7 +141,7 @@ def prepare_preflight(request):
     checks = []
 
     if request.method == "OPTIONS":
-        return None, []
+        return None, ()
 
     for prep in (
             prepare_preflight_allowed_origin,
@@ -141,24 +154,32 @@ def prepare_preflight(request):
     # It is possible to have only one check (origin) which necessitates sending
     # a preflight request even though it won't include any CORS request headers.
     if len(headers) == 0 and len(checks) == 0:
-        return None, []
+        return None, ()
 
     request_headers = HeadersDict(request.headers)
     headers["Host"] = request_headers.get("host", "")
+    if "origin" in request_headers:
+        headers["Origin"] = request_headers["origin"]
     preflight = Request(
         "OPTIONS",
         request.url,
         headers)
 
-    return preflight, checks
+    return preflight, share_checks(checks)
 
-def generate_acceptable_preflight_response_headers(requested):
+def generate_acceptable_preflight_response_headers(requested, max_age=None):
     """
     Given preflight request headers generate necessary CORS response headers.
 
+    Without a max_age the User-Agent caches the preflight for its default of
+    just a few seconds.
+
     """
     response = {"Access-Control-Allow-Origin": "*"}
 
+    if max_age is not None:
+        response["Access-Control-Max-Age"] = str(int(max_age))
+
     if "Access-Control-Request-Method" in requested:
         method = requested["Access-Control-Request-Method"]
         response["Access-Control-Allow-Methods"] = method
@@ -0,0 +1,141 @@
+"""
+Read what CORS needs from raw request headers without decoding the rest.
+
+    cors_headers = parse_header_block(raw_block)
+    block = policy.preflight_header_block(cors_headers.headers)
+    cors_headers.prohibited_headers(policy.headers)
+
+Servers and log auditors often hold request headers as they came off the wire,
+a "Name: value\\r\\n" block or ASGI style (name, value) byte pairs. Only Origin,
+Access-Control-Request-Method and Access-Control-Request-Headers are read from
+them, along with the set of header names; other values are never copied.
+
+"""
+import re
+
+from cors.definitions import IMPLICIT_REQUEST_HEADERS, _normalize_list
+from cors.utils import _share_header_names
+
+
+# The name of a header field at the start of a line. Request lines,
+# continuation lines and blank lines have no name of this form and are skipped.
+_name = re.compile(br"^([^:\s]+)[ \t]*:", re.M)
+_value = re.compile(br"[^\r\n]*")
+
+_fields = {
+    b"origin": "Origin",
+    b"access-control-request-method": "Access-Control-Request-Method",
+    b"access-control-request-headers": "Access-Control-Request-Headers",
+}
+
+
+class RawCORSHeaders(object):
+    """
+    The CORS fields of a request's headers and the names of all of them.
+
+    `names` is the lowercased header names as a sorted tuple, shared with equal
+    sets of names up to `cors.utils.MAX_SHARED_HEADER_NAMES` as
+    `cors.utils.Request.header_names` is. Fields which weren't sent are None.
+
+    """
+    __slots__ = ("names", "origin", "request_method", "request_headers")
+
+    def __init__(self, names, origin=None, request_method=None, request_headers=None):
+        names = tuple(sorted(set(names)))
+        set_ = super(RawCORSHeaders, self).__setattr__
+        set_("names", _share_header_names(names))
+        set_("origin", origin)
+        set_("request_method", request_method)
+        set_("request_headers", request_headers)
+
+    @property
+    def headers(self):
+        """
+        The CORS fields which were sent, in the dict form policies take.
+
+        """
+        headers = {}
+        for name, value in (
+                ("Origin", self.origin),
+                ("Access-Control-Request-Method", self.request_method),
+                ("Access-Control-Request-Headers", self.request_headers)):
+            if value is not None:
+                headers[name] = value
+        return headers
+
+    @property
+    def is_preflight(self):
+        """
+        Whether the headers are a preflight's, given the request was OPTIONS.
+
+        """
+        return self.request_method is not None
+
+    def prohibited_headers(self, allowed):
+        """
+        The headers sent which neither allowed nor CORS itself permit, as
+        `cors.definitions.get_prohibited_headers` finds them for a request.
+
+        """
+        return set(self.names) - IMPLICIT_REQUEST_HEADERS - set(_normalize_list(allowed))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RawCORSHeaders objects are immutable")
+
+    def __repr__(self):
+        return "<RawCORSHeaders %r>" % self.headers
+
+
+def _add_field(values, field, value):
+    value = bytes(value).strip()
+    # repeated fields are combined as a comma separated list
+    if field in values:
+        value = values[field] + "," + value
+    values[field] = value
+
+
+def _raw_headers(names, values):
+    return RawCORSHeaders(
+        names,
+        values.get("Origin"),
+        values.get("Access-Control-Request-Method"),
+        values.get("Access-Control-Request-Headers"))
+
+
+def parse_header_block(block):
+    """
+    Parse a block of "Name: value" lines, optionally led by the request line.
+
+    block may be a str, bytearray, buffer or memoryview. A memoryview is
+    copied to a str once since Python 2's re can't scan one; nothing else is
+    copied save the names and the CORS fields' values.
+
+    """
+    if isinstance(block, memoryview):
+        block = block.tobytes()
+    names = []
+    values = {}
+    for match in _name.finditer(block):
+        name = bytes(match.group(1)).lower()
+        names.append(name)
+        field = _fields.get(name)
+        if field is not None:
+            # only now is the value found and copied
+            _add_field(values, field, _value.match(block, match.end()).group())
+    return _raw_headers(names, values)
+
+
+def parse_header_pairs(pairs):
+    """
+    Parse (name, value) byte string pairs, eg. an ASGI scope's "headers".
+
+    """
+    names = []
+    values = {}
+    for name, value in pairs:
+        name = bytes(name).lower()
+        names.append(name)
+        field = _fields.get(name)
+        if field is not None:
+            _add_field(values, field, value)
+    return _raw_headers(names, values)
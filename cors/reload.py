@@ -0,0 +1,165 @@
+"""
+Server policies which can be replaced while the process is running.
+
+    policies = ReloadablePolicies.from_file("/etc/myapp/cors.json")
+    FileWatcher(policies).start()
+
+    # in a request handler
+    registry = policies.current
+
+A reload builds the new policies in whichever thread calls it and publishes
+them by rebinding a single attribute, so readers never take a lock and a
+request which already fetched `current` keeps using what it fetched.
+
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from cors.routes import PolicyRegistry
+
+
+log = logging.getLogger(__name__)
+
+
+def _compiled_size(policies):
+    try:
+        return len(policies)
+    except TypeError:
+        return 1
+
+
+class ReloadMetrics(object):
+    """
+    How reloads have gone.
+
+    `size` is the number of policies or routes last loaded and durations are
+    in seconds.
+
+    """
+    def __init__(self):
+        self.reloads = 0
+        self.failures = 0
+        self.last_duration = None
+        self.total_duration = 0.0
+        self.size = 0
+
+
+class ReloadablePolicies(object):
+    """
+    Policies rebuilt from load, which takes no arguments and returns them in
+    whatever form the server uses, eg. a `PolicyRegistry`.
+
+    Every reload after the first is recorded as a change of every policy with
+    tuner, a `cors.tuning.MaxAgeTuner`, or the tuner of the policies loaded if
+    they have one, so that tuned max-ages shorten again.
+
+    """
+    def __init__(self, load, path=None, tuner=None):
+        self.load = load
+        self.path = path
+        self.tuner = tuner
+        self.metrics = ReloadMetrics()
+        # serializes writers only, readers just read `current`
+        self._reloading = threading.Lock()
+        self.current = None
+        self.reload()
+
+    @classmethod
+    def from_file(cls, path, build=PolicyRegistry.from_config, tuner=None):
+        """
+        Load policies from a JSON file of routes and `Policy` keyword arguments.
+
+        """
+        def load():
+            with open(path) as f:
+                return build(json.load(f))
+
+        return cls(load, path, tuner)
+
+    def reload(self):
+        """
+        Build the policies again and publish them.
+
+        If load fails the current policies are kept and the error is raised.
+
+        """
+        with self._reloading:
+            start = time.time()
+            try:
+                policies = self.load()
+            except Exception:
+                self.metrics.failures += 1
+                raise
+            duration = time.time() - start
+
+            reloaded = self.current is not None
+            self.current = policies
+            self.metrics.reloads += 1
+            self.metrics.last_duration = duration
+            self.metrics.total_duration += duration
+            self.metrics.size = _compiled_size(policies)
+
+        tuner = self.tuner or getattr(policies, "tuner", None)
+        if reloaded and tuner is not None:
+            tuner.policy_changed()
+        return policies
+
+
+class FileWatcher(object):
+    """
+    Reload policies whenever the file they're loaded from changes.
+
+    The file is polled every interval seconds from a daemon thread. A file
+    which fails to load is logged and its policies left as they were.
+
+    """
+    def __init__(self, policies, path=None, interval=1.0):
+        self.policies = policies
+        self.path = path or policies.path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+        self._stamp = self._read_stamp()
+
+    def _read_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def check(self):
+        """
+        Reload if the file has changed since it was last checked.
+
+        """
+        stamp = self._read_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            self.policies.reload()
+        except Exception:
+            log.exception("Failed to reload CORS policies from %s", self.path)
+            return False
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="cors-policy-watcher")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
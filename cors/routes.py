@@ -0,0 +1,175 @@
+from cors.policy import Policy, _headers
+from cors.utils import HeaderBlock
+
+
+WILDCARD = "*"
+
+
+def _segments(path):
+    path = path.split("?", 1)[0].split("#", 1)[0]
+    return [segment for segment in path.split("/") if segment]
+
+
+class _Node(object):
+    __slots__ = ("children", "wildcard", "policy", "route")
+
+    def __init__(self):
+        self.children = {}
+        self.wildcard = None
+        self.policy = None
+        self.route = None
+
+
+class PolicyRegistry(object):
+    """
+    Policies by route, kept in a trie of path segments.
+
+    A route is a path prefix such as "/api/public" and applies to every path
+    beneath it. A "*" segment matches any one segment, eg. "/partners/*/orders".
+    A path gets the policy of the longest route matching it, literal segments
+    winning over "*" where routes are equally long, or default if none does.
+
+    Given a `cors.tuning.MaxAgeTuner`, preflights of routes whose policy sets
+    no max_age get one from the tuner. Given a `cors.tracking.PreflightTracker`
+    every preflight is counted by it, whether allowed or not.
+
+    """
+    def __init__(self, routes=None, default=None, tuner=None, tracker=None):
+        self.default = default
+        self.tuner = tuner
+        self.tracker = tracker
+        self._root = _Node()
+        self._count = 0
+        if routes:
+            self.update(routes)
+
+    @classmethod
+    def from_config(cls, routes, default=None, tuner=None, tracker=None):
+        """
+        Build a registry from a mapping of routes to `Policy` keyword arguments.
+
+        Routes configured alike share one compiled policy.
+
+        """
+        compiled = {}
+        registry = cls(default=default, tuner=tuner, tracker=tracker)
+        for route, kwargs in routes.items():
+            key = repr(sorted(kwargs.items()))
+            try:
+                policy = compiled[key]
+            except KeyError:
+                policy = compiled[key] = Policy(**kwargs)
+            registry.register(route, policy)
+        return registry
+
+    def register(self, route, policy):
+        segments = _segments(route)
+        node = self._root
+        for segment in segments:
+            if segment == WILDCARD:
+                if node.wildcard is None:
+                    node.wildcard = _Node()
+                node = node.wildcard
+            else:
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = _Node()
+                node = child
+        if node.policy is None:
+            self._count += 1
+        node.policy = policy
+        node.route = "/" + "/".join(segments)
+
+    def update(self, routes):
+        """
+        Register many routes, given as a mapping or (route, policy) pairs.
+
+        """
+        if hasattr(routes, "items"):
+            routes = routes.items()
+        for route, policy in routes:
+            self.register(route, policy)
+
+    def policy_for(self, path):
+        route, policy = self.match(path)
+        return policy
+
+    def match(self, path):
+        """
+        The route matching path and its policy, or (None, default).
+
+        """
+        # walk every node the path could be at, literal matches ahead of
+        # wildcards, remembering the first policy found at the deepest level
+        match = self._root if self._root.policy is not None else None
+        nodes = [self._root]
+        for segment in _segments(path):
+            following = []
+            for node in nodes:
+                child = node.children.get(segment)
+                if child is not None:
+                    following.append(child)
+                if node.wildcard is not None:
+                    following.append(node.wildcard)
+            if not following:
+                break
+            nodes = following
+            for node in nodes:
+                if node.policy is not None:
+                    match = node
+                    break
+        if match is None:
+            return None, self.default
+        return match.route, match.policy
+
+    def preflight_response_headers(self, path, requested):
+        """
+        The CORS headers for a preflight of path, or {} if no policy covers it.
+
+        """
+        if self.tracker is not None:
+            self.tracker.observe(requested)
+        route, policy = self.match(path)
+        if policy is None:
+            return {}
+        return self._preflight_response_headers(route, policy, requested)
+
+    def _tuned(self, policy):
+        return self.tuner is not None and policy.max_age is None
+
+    def _preflight_response_headers(self, route, policy, requested):
+        response = policy.preflight_response_headers(requested)
+        # refused preflights, which carry at most the policy's version, are
+        # neither tuned nor counted by the tuner
+        if "Access-Control-Allow-Origin" in response and self._tuned(policy):
+            origin = _headers(requested).get("Origin")
+            response["Access-Control-Max-Age"] = str(self.tuner.observe(route, origin))
+        return response
+
+    def preflight_header_block(self, path, requested):
+        """
+        `preflight_response_headers` as a `HeaderBlock`, or None if no policy
+        covers path.
+
+        Blocks are the ones the policy keeps encoded, except where the tuner
+        chooses the max-age; those change over time and so are encoded anew.
+
+        """
+        route, policy = self.match(path)
+        if policy is None:
+            # left for whatever answers the preflight instead to count
+            return None
+        if self.tracker is not None:
+            self.tracker.observe(requested)
+        if not self._tuned(policy):
+            return policy.preflight_header_block(requested)
+        return HeaderBlock(self._preflight_response_headers(route, policy, requested))
+
+    def actual_response_headers(self, path, response, origin):
+        policy = self.policy_for(path)
+        if policy is None:
+            return dict(response)
+        return policy.actual_response_headers(response, origin)
+
+    def __len__(self):
+        return self._count
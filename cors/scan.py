@@ -0,0 +1,187 @@
+"""
+Check many endpoints' CORS responses concurrently.
+
+    python -m cors.scan endpoints.json --concurrency 200 --per-host 8 > results.jsonl
+
+The endpoint list is a JSON list in the same form as a `cors.warmup` manifest:
+objects with a "url", an "origin" and optionally a "method" and "headers".
+Each endpoint's preflight is sent and checked as `prepare_preflight` decides,
+and with --actual so are GET and HEAD requests themselves. Results are written
+as they arrive, one JSON object per line with a "status" of "ok", "violation",
+"error" or "skipped".
+
+"""
+from __future__ import absolute_import
+
+import argparse
+import json
+import sys
+import time
+
+from tornado.gen import coroutine, multi, Return
+from tornado.ioloop import IOLoop
+
+from cors.clients.tornado import SPECULATIVE_METHODS, safe_fetch
+from cors.errors import AccessControlError
+from cors.lazy import LazyModule
+from cors.preflight import check_origin, prepare_preflight
+from cors.warmup import load_manifest
+
+
+httpclient = LazyModule("tornado.httpclient")
+urlparse = LazyModule("urlparse")
+
+
+def _host(url):
+    return urlparse.urlparse(url).netloc.lower()
+
+
+def _http_request(request, timeout):
+    headers = dict(
+        (name, value) for name, value in request.headers.items()
+        # let the client fill in the Host header
+        if name.lower() != "host" or value)
+    return httpclient.HTTPRequest(
+        request.url,
+        request.method,
+        headers,
+        connect_timeout=timeout,
+        request_timeout=timeout,
+        follow_redirects=False)
+
+
+def create_client(concurrency):
+    """
+    A client able to keep concurrency requests in flight, keeping connections
+    alive between them where pycurl is installed.
+
+    """
+    try:
+        from tornado.curl_httpclient import CurlAsyncHTTPClient as client_class
+    except ImportError:
+        from tornado.simple_httpclient import SimpleAsyncHTTPClient as client_class
+    return client_class(force_instance=True, max_clients=concurrency)
+
+
+class Scanner(object):
+    """
+    Scan endpoints with at most concurrency requests in flight overall and at
+    most per_host to any one host.
+
+    """
+    def __init__(self, client=None, concurrency=100, per_host=4, timeout=10.0,
+                 actual=False):
+        from tornado.locks import Semaphore
+        self.client = client or create_client(concurrency)
+        self.per_host = per_host
+        self.timeout = timeout
+        self.actual = actual
+        self._slots = Semaphore(concurrency)
+        self._hosts = {}
+
+    @coroutine
+    def _fetch(self, request):
+        from tornado.locks import Semaphore
+        host = _host(request.url)
+        if host not in self._hosts:
+            self._hosts[host] = Semaphore(self.per_host)
+
+        with (yield self._hosts[host].acquire()):
+            with (yield self._slots.acquire()):
+                response = yield safe_fetch(
+                    self.client.fetch, _http_request(request, self.timeout))
+        # timeouts and connection failures rather than responses
+        if response.code == 599:
+            raise response.error
+        raise Return(response)
+
+    @coroutine
+    def scan_one(self, request):
+        """
+        Check one endpoint and return its result.
+
+        """
+        result = {
+            "url": request.url,
+            "method": request.method,
+            "origin": request.headers.get("Origin"),
+            "status": "ok",
+        }
+        start = time.time()
+        try:
+            preflight, checks = prepare_preflight(request)
+            sent = False
+            if preflight is not None:
+                response = yield self._fetch(preflight)
+                if response.error:
+                    raise AccessControlError(
+                        "Pre-flight check failed with %d",
+                        preflight.url,
+                        preflight.method,
+                        preflight.headers,
+                        format_args=(response.code,))
+                for check in checks:
+                    check(response, request)
+                sent = True
+
+            if self.actual and request.method in SPECULATIVE_METHODS:
+                response = yield self._fetch(request)
+                if response.code / 100 != 5:
+                    check_origin(response, request)
+                sent = True
+
+            if not sent:
+                result["status"] = "skipped"
+        except AccessControlError as e:
+            result["status"] = "violation"
+            result["error"] = e.message
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+        result["elapsed"] = round(time.time() - start, 6)
+        raise Return(result)
+
+    @coroutine
+    def scan(self, requests_, on_result):
+        """
+        Check every endpoint, passing each result to on_result as it arrives.
+
+        """
+        @coroutine
+        def scan_and_report(request):
+            on_result((yield self.scan_one(request)))
+
+        yield multi([scan_and_report(request) for request in requests_])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check the CORS responses of a list of endpoints, writing "
+                    "results as JSON lines.")
+    parser.add_argument("endpoints")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--actual", action="store_true",
+                        help="also send GET and HEAD requests and check them")
+    args = parser.parse_args(argv)
+
+    scanner = Scanner(
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        timeout=args.timeout,
+        actual=args.actual)
+
+    counts = {}
+    def write(result):
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        sys.stdout.write(json.dumps(result, sort_keys=True) + "\n")
+        sys.stdout.flush()
+
+    requests_ = load_manifest(args.endpoints)
+    IOLoop.current().run_sync(lambda: scanner.scan(requests_, write))
+    return 1 if counts.get("violation") or counts.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
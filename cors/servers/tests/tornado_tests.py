@@ -0,0 +1,117 @@
+from tornado.httpclient import HTTPRequest
+from tornado.tcpclient import TCPClient
+from tornado.testing import AsyncHTTPTestCase, gen_test
+from tornado.web import Application, RequestHandler
+
+from cors.policy import Policy
+from cors.routes import PolicyRegistry
+from cors.servers.tornado import PreflightDelegate
+from cors.tracking import PreflightTracker
+from cors.tuning import MaxAgeTuner
+
+
+class Handler(RequestHandler):
+    created = 0
+
+    def initialize(self):
+        type(self).created += 1
+
+    def get(self):
+        self.write("handled")
+
+    def options(self):
+        self.write("handled")
+
+
+class PreflightDelegateTests(AsyncHTTPTestCase):
+    def setUp(self):
+        Handler.created = 0
+        self.tracker = PreflightTracker()
+        self.tuner = MaxAgeTuner(min_age=7, clock=lambda: 1000.0)
+        super(PreflightDelegateTests, self).setUp()
+
+    def get_app(self):
+        return PreflightDelegate(
+            Application([(r"/.*", Handler)]),
+            PolicyRegistry({
+                "/api": Policy(origins=["http://foo"], methods=["GET", "PUT"], max_age=60),
+                "/tuned": Policy(origins=["http://foo"]),
+            }, tracker=self.tracker, tuner=self.tuner))
+
+    def _preflight(self, path="/api/items", origin="http://foo"):
+        return HTTPRequest(
+            self.get_url(path),
+            "OPTIONS",
+            headers={
+                "Origin": origin,
+                "Access-Control-Request-Method": "PUT",
+            })
+
+    @gen_test
+    def test_preflight_answered_without_handler(self):
+        response = yield self.http_client.fetch(self._preflight())
+
+        self.assertEqual(response.code, 204)
+        self.assertEqual(response.headers["Access-Control-Allow-Origin"], "http://foo")
+        self.assertEqual(response.headers["Access-Control-Allow-Methods"], "GET,PUT")
+        self.assertEqual(response.headers["Access-Control-Max-Age"], "60")
+        self.assertEqual(Handler.created, 0)
+
+    @gen_test
+    def test_registry_tracker_and_tuner_fed(self):
+        yield self.http_client.fetch(self._preflight())
+        tuned = yield self.http_client.fetch(self._preflight(path="/tuned"))
+        yield self.http_client.fetch(self._preflight(path="/other"))
+
+        self.assertEqual(tuned.code, 204)
+        self.assertEqual(tuned.headers["Access-Control-Max-Age"], "7")
+        self.assertEqual(self.tuner.report().preflights, 1)
+        # the uncovered path's preflight is left to the application to count
+        self.assertEqual(self.tracker.snapshot().total, 2)
+        self.assertEqual(self.tracker.snapshot().top[0][:3], ("http://foo", "PUT", ""))
+        self.assertEqual(Handler.created, 1)
+
+    @gen_test
+    def test_disallowed_origin_gets_no_cors_headers(self):
+        response = yield self.http_client.fetch(self._preflight(origin="http://bar"))
+
+        self.assertEqual(response.code, 204)
+        self.assertNotIn("Access-Control-Allow-Origin", response.headers)
+        self.assertEqual(Handler.created, 0)
+
+    @gen_test
+    def test_uncovered_path_passed_through(self):
+        response = yield self.http_client.fetch(self._preflight(path="/other"))
+
+        self.assertEqual(response.body, "handled")
+        self.assertEqual(Handler.created, 1)
+
+    @gen_test
+    def test_other_requests_passed_through(self):
+        response = yield self.http_client.fetch(self.get_url("/api/items"))
+        options = yield self.http_client.fetch(self.get_url("/api/items"), method="OPTIONS")
+
+        self.assertEqual(response.body, "handled")
+        self.assertEqual(options.body, "handled")
+        self.assertEqual(Handler.created, 2)
+
+    @gen_test
+    def test_keep_alive(self):
+        # several preflights answered over one connection
+        stream = yield TCPClient().connect("127.0.0.1", self.get_http_port())
+        request = (
+            "OPTIONS /api/items HTTP/1.1\r\n"
+            "Host: localhost\r\n"
+            "Origin: http://foo\r\n"
+            "Access-Control-Request-Method: PUT\r\n\r\n")
+        try:
+            yield stream.write(request * 3)
+            responses = []
+            for _ in range(3):
+                responses.append((yield stream.read_until("\r\n\r\n")))
+        finally:
+            # while the test's IOLoop is still open
+            stream.close()
+
+        for response in responses:
+            self.assertTrue(response.startswith("HTTP/1.1 204 No Content"))
@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+
+from tornado.httputil import (
+    HTTPHeaders,
+    HTTPMessageDelegate,
+    HTTPServerConnectionDelegate,
+    ResponseStartLine,
+)
+
+
+class PreflightDelegate(HTTPServerConnectionDelegate):
+    """
+    Answer preflights before they reach a Tornado application.
+
+    Wraps application, or any other `HTTPServerConnectionDelegate`, and is
+    given to the `HTTPServer` in its place. OPTIONS requests carrying an
+    Access-Control-Request-Method are answered at the connection layer from
+    the encoded header blocks of policies, which may be a `cors.policy.Policy`
+    or a `cors.routes.PolicyRegistry`, without routing or creating a handler.
+    Every other request, and preflights of paths no policy covers, go on to
+    the application. A registry's tracker and tuner see these preflights just
+    as they see those it answers through `preflight_response_headers`.
+
+    """
+    def __init__(self, application, policies):
+        self.application = application
+        self.policies = policies
+
+    def preflight_header_block(self, path, requested):
+        """
+        The `HeaderBlock` to answer a preflight of path with, or None if no
+        policy covers it.
+
+        """
+        if getattr(self.policies, "policy_for", None) is None:
+            return self.policies.preflight_header_block(requested)
+        return self.policies.preflight_header_block(path, requested)
+
+    def start_request(self, server_conn, request_conn):
+        return _PreflightMessageDelegate(self, server_conn, request_conn)
+
+    def on_close(self, server_conn):
+        self.application.on_close(server_conn)
+
+
+class _PreflightMessageDelegate(HTTPMessageDelegate):
+    def __init__(self, server, server_conn, request_conn):
+        self.server = server
+        self.server_conn = server_conn
+        self.request_conn = request_conn
+        self.delegate = None
+        self.answer = None
+
+    def headers_received(self, start_line, headers):
+        if start_line.method == "OPTIONS" and "Access-Control-Request-Method" in headers:
+            block = self.server.preflight_header_block(start_line.path, headers)
+            if block is not None:
+                # answered once the request has been read, so that the
+                # connection can be kept alive
+                self.answer = (start_line.version, block)
+                return
+
+        self.delegate = self.server.application.start_request(
+            self.server_conn, self.request_conn)
+        return self.delegate.headers_received(start_line, headers)
+
+    def data_received(self, chunk):
+        if self.delegate is not None:
+            return self.delegate.data_received(chunk)
+
+    def finish(self):
+        if self.delegate is not None:
+            self.delegate.finish()
+            return
+
+        version, block = self.answer
+        headers = HTTPHeaders()
+        for name, value in block.items:
+            headers.add(name, value)
+        self.request_conn.write_headers(
+            ResponseStartLine(version, 204, "No Content"), headers)
+        self.request_conn.finish()
+
+    def on_connection_close(self):
+        if self.delegate is not None:
+            self.delegate.on_connection_close()
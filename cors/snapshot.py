@@ -0,0 +1,123 @@
+"""
+Compiled policies and preflight plans saved for fast start up.
+
+A snapshot file is a fixed size header followed by a marshalled payload:
+
+    magic       8 bytes   "CORSSNAP"
+    version     uint16    SNAPSHOT_VERSION
+    checksum    uint32    crc32 of the payload
+    source      20 bytes  sha1 fingerprint of what the snapshot was built from
+    payload     marshal   {"policies": {name: state}, "plans": {shape: plan}}
+
+"""
+import hashlib
+import json
+import marshal
+import os
+import struct
+import tempfile
+import zlib
+
+from cors.plans import PlanTable
+from cors.policy import Policy
+
+
+MAGIC = b"CORSSNAP"
+SNAPSHOT_VERSION = 2
+HEADER = struct.Struct(">8sHI20s")
+
+
+class Snapshot(object):
+    def __init__(self, policies, plans):
+        self.policies = policies
+        self.plans = plans
+
+
+def fingerprint(policies, requests=()):
+    """
+    Identify the configuration a snapshot is built from.
+
+    policies maps names to the keyword arguments of their `Policy` and
+    requests are sample requests whose plans should be precompiled.
+
+    """
+    source = {
+        "policies": policies,
+        "requests": [
+            [r.method, r.url, sorted(dict(r.headers).items())]
+            for r in requests
+        ],
+    }
+    return hashlib.sha1(json.dumps(source, sort_keys=True)).digest()
+
+def dumps(snapshot, source):
+    payload = marshal.dumps({
+        "policies": dict(
+            (name, policy.compiled())
+            for name, policy in snapshot.policies.items()),
+        "plans": snapshot.plans.compiled(),
+    })
+    checksum = zlib.crc32(payload) & 0xffffffff
+    return HEADER.pack(MAGIC, SNAPSHOT_VERSION, checksum, source) + payload
+
+def loads(data, source=None):
+    """
+    Load a snapshot, or return None if it is corrupt, stale or unsupported.
+
+    """
+    if len(data) < HEADER.size:
+        return None
+    magic, version, checksum, snapshot_source = HEADER.unpack_from(data)
+    if magic != MAGIC or version != SNAPSHOT_VERSION:
+        return None
+    if source is not None and snapshot_source != source:
+        return None
+
+    payload = data[HEADER.size:]
+    if zlib.crc32(payload) & 0xffffffff != checksum:
+        return None
+    try:
+        payload = marshal.loads(payload)
+    except (EOFError, ValueError, TypeError):
+        return None
+
+    return Snapshot(
+        dict(
+            (name, Policy.from_compiled(state))
+            for name, state in payload["policies"].items()),
+        PlanTable.from_compiled(payload["plans"]))
+
+def save(path, snapshot, source):
+    # write to a temporary file and rename so readers never see a partial file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix=".cors-snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dumps(snapshot, source))
+        os.rename(temporary, path)
+    except Exception:
+        os.unlink(temporary)
+        raise
+
+def load(path, source=None):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except IOError:
+        return None
+    return loads(data, source)
+
+def load_or_compile(path, policies, requests=()):
+    """
+    Load compiled policies and plans from path, compiling and saving them if
+    the snapshot there is missing or was built from a different configuration.
+
+    """
+    source = fingerprint(policies, requests)
+    snapshot = load(path, source)
+    if snapshot is None:
+        snapshot = Snapshot(
+            dict((name, Policy(**kwargs)) for name, kwargs in policies.items()),
+            PlanTable.from_requests(requests))
+        save(path, snapshot, source)
+    return snapshot
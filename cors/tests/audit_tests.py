@@ -0,0 +1,81 @@
+import copy
+import pickle
+import unittest
+
+import mock
+
+from cors.audit import Auditor
+from cors.errors import AccessControlError
+
+
+class AuditorTests(unittest.TestCase):
+    def test_records_bounded(self):
+        auditor = Auditor(max_records=2)
+        errors = [AccessControlError(str(i)) for i in range(3)]
+
+        for error in errors:
+            auditor.record(error)
+
+        self.assertEqual(list(auditor.records), errors[1:])
+        self.assertEqual(auditor.violations, 3)
+
+    def test_observer_notified(self):
+        observer = mock.MagicMock()
+        auditor = Auditor(observer=observer)
+        error = AccessControlError("foo")
+
+        auditor.record(error)
+
+        observer.assert_called_once_with(error)
+
+    def test_observer_failure_swallowed(self):
+        auditor = Auditor(observer=mock.MagicMock(side_effect=ValueError))
+
+        auditor.record(AccessControlError("foo"))
+
+        self.assertEqual(auditor.violations, 1)
+
+    @mock.patch("random.random")
+    def test_sample_rate(self, random):
+        random.side_effect = [0.1, 0.5, 0.9]
+        auditor = Auditor(sample_rate=0.5)
+
+        sampled = [auditor.sample() for _ in range(3)]
+
+        self.assertEqual(sampled, [True, False, False])
+        self.assertEqual(auditor.sampled, 1)
+        self.assertEqual(auditor.skipped, 2)
+
+    def test_everything_sampled_by_default(self):
+        auditor = Auditor()
+
+        self.assertTrue(all(auditor.sample() for _ in range(100)))
+
+
+class AccessControlErrorFormattingTests(unittest.TestCase):
+    def test_message_formatted_when_read(self):
+        value = mock.MagicMock()
+        value.__repr__ = mock.MagicMock(return_value="<value>")
+
+        error = AccessControlError("Value %r not allowed", format_args=(value,))
+
+        self.assertEqual(value.__repr__.call_count, 0)
+        self.assertEqual(error.message, "Value <value> not allowed")
+        self.assertEqual(str(error), "Value <value> not allowed")
+
+    def test_repr_formatted(self):
+        error = AccessControlError("Method %r not allowed", format_args=("PUT",))
+
+        self.assertEqual(repr(error), "AccessControlError(\"Method 'PUT' not allowed\")")
+
+    def test_pickle_and_copy_keep_format_args(self):
+        error = AccessControlError(
+            "Method %r not allowed", "http://api/", "PUT", {"X-Foo": "1"},
+            format_args=("PUT",))
+
+        for restored in (pickle.loads(pickle.dumps(error, 2)), copy.copy(error)):
+            self.assertEqual(str(restored), "Method 'PUT' not allowed")
+            self.assertEqual(restored.format_args, ("PUT",))
+            self.assertEqual(restored.url, "http://api/")
+            self.assertEqual(restored.method, "PUT")
+            self.assertEqual(restored.headers, {"X-Foo": "1"})
@@ -0,0 +1,434 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from cors import cache
+from cors.errors import AccessControlError
+from cors.utils import Request
+
+
+class Function_preflight_key_Tests(unittest.TestCase):
+    def test_requested_headers_normalized(self):
+        request = Request("PUT", "http://foo/", {"Origin": "http://bar"})
+        one = Request("OPTIONS", "http://foo/", {
+            "Access-Control-Request-Method": "PUT",
+            "Access-Control-Request-Headers": "X-Foo,Content-Type",
+        })
+        two = Request("OPTIONS", "http://foo/", {
+            "access-control-request-method": "put",
+            "access-control-request-headers": "content-type, x-foo",
+        })
+
+        self.assertEqual(
+            cache.preflight_key(one, request),
+            cache.preflight_key(two, request))
+
+    def test_origin_distinguishes_keys(self):
+        preflight = Request("OPTIONS", "http://foo/", {})
+        one = Request("GET", "http://foo/", {"Origin": "http://bar"})
+        two = Request("GET", "http://foo/", {"Origin": "http://baz"})
+
+        self.assertNotEqual(
+            cache.preflight_key(preflight, one),
+            cache.preflight_key(preflight, two))
+
+
+class Function_get_max_age_Tests(unittest.TestCase):
+    def test_max_age(self):
+        self.assertEqual(cache.get_max_age({"Access-Control-Max-Age": "600"}), 600)
+
+    def test_missing_or_invalid_max_age(self):
+        self.assertEqual(cache.get_max_age({}), cache.DEFAULT_MAX_AGE)
+        self.assertEqual(
+            cache.get_max_age({"Access-Control-Max-Age": "soon"}),
+            cache.DEFAULT_MAX_AGE)
+
+
+class CachedPreflightTests(unittest.TestCase):
+    def test_only_cors_headers_kept(self):
+        response = mock.MagicMock()
+        response.headers = {
+            "Access-Control-Allow-Origin": "*",
+            "access-control-allow-headers": "X-Foo",
+            "Content-Length": "0",
+        }
+
+        entry = cache.CachedPreflight.from_response(response, now=0)
+
+        self.assertEqual(dict(entry.headers), {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "X-Foo",
+        })
+        self.assertEqual(entry.expires, cache.DEFAULT_MAX_AGE)
+
+
+class PreflightCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = cache.PreflightCache(stripes=4)
+
+    def test_expired_entries_dropped(self):
+        self.cache.set("foo", cache.CachedPreflight({}, time.time() - 1))
+
+        self.assertIsNone(self.cache.get("foo"))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_get_or_fetch_caches(self):
+        entry = cache.CachedPreflight({}, time.time() + 60)
+        fetch = mock.MagicMock(return_value=entry)
+
+        self.assertIs(self.cache.get_or_fetch("foo", fetch), entry)
+        self.assertIs(self.cache.get_or_fetch("foo", fetch), entry)
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_concurrent_misses_fetch_once(self):
+        entry = cache.CachedPreflight({}, time.time() + 60)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return entry
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.cache.get_or_fetch("foo", fetch)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [entry] * 4)
+
+    def test_entry_stored_before_key_claimed(self):
+        # as if another thread stored the entry while our lookup was under way
+        entry = cache.CachedPreflight({}, time.time() + 60)
+        self.cache.set("foo", entry)
+        get = self.cache.backend.get
+        stale = [None]
+        self.cache.backend.get = lambda key: stale.pop() if stale else get(key)
+        fetch = mock.MagicMock()
+
+        self.assertIs(self.cache.get_or_fetch("foo", fetch), entry)
+        self.assertEqual(fetch.call_count, 0)
+
+    def test_failed_fetch_not_cached(self):
+        fetch = mock.MagicMock(side_effect=ValueError)
+
+        with self.assertRaises(ValueError):
+            self.cache.get_or_fetch("foo", fetch)
+
+        self.assertEqual(len(self.cache), 0)
+
+
+class PreflightCacheNegativeTests(unittest.TestCase):
+    key = ("http://foo", "http://bar/", "PUT", "")
+
+    def setUp(self):
+        self.cache = cache.PreflightCache(negative_ttl=30)
+
+    def test_failed_fetch_remembered(self):
+        fetch = mock.MagicMock(side_effect=AccessControlError("nope"))
+
+        for _ in range(3):
+            with self.assertRaises(AccessControlError) as context:
+                self.cache.get_or_fetch(self.key, fetch)
+            self.assertEqual(context.exception.message, "nope")
+
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(self.cache.suppressed, 2)
+
+    def test_rejected_key_raises_without_fetching(self):
+        fetch = mock.MagicMock()
+        self.cache.reject(self.key, AccessControlError("nope"))
+
+        with self.assertRaises(AccessControlError) as context:
+            self.cache.get_or_fetch(self.key, fetch)
+
+        self.assertEqual(context.exception.url, "http://bar/")
+        self.assertEqual(fetch.call_count, 0)
+
+    def test_rejections_expire(self):
+        self.cache.negative_ttl = 0.01
+        self.cache.reject(self.key, AccessControlError("nope"))
+        time.sleep(0.02)
+
+        self.assertIsNone(self.cache.lookup(self.key))
+
+    def test_disabled_by_default(self):
+        preflights = cache.PreflightCache()
+        preflights.reject(self.key, AccessControlError("nope"))
+
+        self.assertIsNone(preflights.lookup(self.key))
+        self.assertEqual(len(preflights), 0)
+
+    def test_rejections_shared_through_backend(self):
+        backend = cache.RedisBackend(FakeRedis())
+        cache.PreflightCache(backend, negative_ttl=30).reject(
+            self.key, AccessControlError("nope"))
+
+        with self.assertRaises(AccessControlError):
+            cache.PreflightCache(backend).lookup(self.key)
+
+
+class FakeRedis(object):
+    """
+    Just enough of a redis client to stand in for a server.
+
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        value, expires = self.data.get(name, (None, None))
+        if expires is not None and expires <= time.time():
+            del self.data[name]
+            return None
+        return value
+
+    def set(self, name, value, px=None):
+        self.data[name] = (value, time.time() + px / 1000.0 if px else None)
+
+    def delete(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+
+    def scan_iter(self, match="*"):
+        # redis globs escape special characters with backslashes
+        pattern = re.sub(
+            r"\\(.)|(\*)|(\?)|(.)",
+            lambda m: (
+                re.escape(m.group(1) or m.group(4) or "")
+                + (".*" if m.group(2) else "")
+                + ("." if m.group(3) else "")),
+            match)
+        return [k for k in list(self.data) if re.match(pattern + "$", k)]
+
+
+class BackendTestsMixin(object):
+    key = ("http://foo", "http://bar/", "PUT", "x-foo")
+
+    def _entry(self, ttl=60):
+        return cache.CachedPreflight(
+            {"Access-Control-Allow-Methods": "PUT"},
+            time.time() + ttl)
+
+    def test_set_and_get(self):
+        self.backend.set(self.key, self._entry(), 60)
+
+        entry = self.backend.get(self.key)
+
+        self.assertEqual(entry.headers["Access-Control-Allow-Methods"], "PUT")
+        self.assertTrue(entry.ok)
+        self.assertEqual(len(self.backend), 1)
+
+    def test_missing_key(self):
+        self.assertIsNone(self.backend.get(self.key))
+
+    def test_expired_entry(self):
+        self.backend.set(self.key, self._entry(ttl=0.01), 0.01)
+        time.sleep(0.02)
+
+        self.assertIsNone(self.backend.get(self.key))
+
+    def test_delete_and_clear(self):
+        other = ("http://foo", "http://baz/", "", "")
+        self.backend.set(self.key, self._entry(), 60)
+        self.backend.set(other, self._entry(), 60)
+
+        self.backend.delete(self.key)
+
+        self.assertIsNone(self.backend.get(self.key))
+        self.assertIsNotNone(self.backend.get(other))
+
+        self.backend.clear()
+
+        self.assertEqual(len(self.backend), 0)
+
+    def test_delete_origin(self):
+        other = ("http://foo*", "http://baz/", "", "")
+        self.backend.set(self.key, self._entry(), 60)
+        self.backend.set(("http://foo", "http://baz/", "", ""), self._entry(), 60)
+        self.backend.set(other, self._entry(), 60)
+
+        self.backend.delete_origin("http://foo")
+
+        self.assertIsNone(self.backend.get(self.key))
+        self.assertIsNotNone(self.backend.get(other))
+        self.assertEqual(len(self.backend), 1)
+
+    def test_delete_origin_for_server(self):
+        keys = [
+            ("http://foo", "http://baz/", "", ""),
+            ("http://foo", "HTTP://Baz/items?x=1", "PUT", ""),
+            ("http://foo", "http://baz:8080/", "", ""),
+            ("http://foo", "http://bazaar/", "", ""),
+            ("http://bar", "http://baz/", "", ""),
+        ]
+        for key in keys:
+            self.backend.set(key, self._entry(), 60)
+
+        self.backend.delete_origin("http://foo", "http://baz")
+
+        self.assertEqual(
+            [self.backend.get(key) is not None for key in keys],
+            [False, False, True, True, True])
+
+
+class MemoryBackendTests(BackendTestsMixin, unittest.TestCase):
+    def setUp(self):
+        self.backend = cache.MemoryBackend()
+
+    def test_least_recently_used_evicted(self):
+        self.backend = cache.MemoryBackend(max_entries=2)
+        self.backend.set("a", self._entry(), 60)
+        self.backend.set("b", self._entry(), 60)
+        self.backend.get("a")
+
+        self.backend.set("c", self._entry(), 60)
+
+        self.assertIsNotNone(self.backend.get("a"))
+        self.assertIsNone(self.backend.get("b"))
+        self.assertIsNotNone(self.backend.get("c"))
+
+
+class PartitionedBackendTests(BackendTestsMixin, unittest.TestCase):
+    def setUp(self):
+        self.backend = cache.PartitionedBackend()
+
+    def test_least_recently_used_origins_dropped(self):
+        self.backend = cache.PartitionedBackend(max_entries=3)
+        for origin in ("a", "b", "c"):
+            self.backend.set((origin, "u", "PUT", ""), self._entry(), 60)
+        self.backend.get(("a", "u", "PUT", ""))
+
+        self.backend.set(("d", "u", "PUT", ""), self._entry(), 60)
+
+        self.assertIsNotNone(self.backend.get(("a", "u", "PUT", "")))
+        self.assertIsNone(self.backend.get(("b", "u", "PUT", "")))
+        self.assertEqual(len(self.backend), 3)
+        self.assertEqual(self.backend.origins, 3)
+
+    def test_entries_share_strings(self):
+        origin = "".join(["http://", "foo"])
+        self.backend.set((origin, "u", "PUT", ""), self._entry(), 60)
+
+        partition_origin, = self.backend._partitions
+        (_, headers, _, _), = self.backend._partitions[partition_origin].values()
+
+        self.assertIs(partition_origin, intern("http://foo"))
+        self.assertIs(headers[0][1], intern("PUT"))
+
+
+class SQLiteBackendTests(BackendTestsMixin, unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "preflights.db")
+        self.backend = cache.SQLiteBackend(self.path)
+
+    def test_shared_between_instances(self):
+        self.backend.set(self.key, self._entry(), 60)
+
+        other = cache.SQLiteBackend(self.path)
+
+        self.assertIsNotNone(other.get(self.key))
+
+    def test_purge(self):
+        self.backend.set(self.key, self._entry(ttl=-1), -1)
+
+        self.backend.purge()
+
+        count = self.backend._connection().execute(
+            "SELECT COUNT(*) FROM cors_preflights").fetchone()[0]
+        self.assertEqual(count, 0)
+
+
+class RedisBackendTests(BackendTestsMixin, unittest.TestCase):
+    def setUp(self):
+        self.backend = cache.RedisBackend(FakeRedis(), prefix="test[1]:")
+
+    def test_clear_leaves_other_prefixes(self):
+        self.backend.client.set("unrelated", "foo")
+        self.backend.set(self.key, self._entry(), 60)
+
+        self.backend.clear()
+
+        self.assertEqual(self.backend.client.get("unrelated"), "foo")
+
+
+class PreflightCacheBackendTests(unittest.TestCase):
+    def test_entries_stored_in_backend(self):
+        backend = cache.RedisBackend(FakeRedis())
+        preflights = cache.PreflightCache(backend)
+        fetch = mock.MagicMock(return_value=cache.CachedPreflight(
+            {"Access-Control-Allow-Origin": "*"},
+            time.time() + 60))
+
+        preflights.get_or_fetch(("a", "b", "c", "d"), fetch)
+        entry = cache.PreflightCache(backend).get(("a", "b", "c", "d"))
+
+        self.assertEqual(entry.headers["Access-Control-Allow-Origin"], "*")
+
+
+class PreflightCacheVersionTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = cache.PreflightCache()
+        for origin in ("http://foo", "http://bar"):
+            self.cache.set((origin, "http://baz/", "PUT", ""), cache.CachedPreflight(
+                {"Access-Control-Allow-Origin": "*"}, time.time() + 3600))
+
+    def _response(self, version):
+        response = mock.Mock()
+        response.headers = {"CORS-Policy-Version": version} if version else {}
+        return response
+
+    def test_changed_version_drops_origin(self):
+        request = Request("PUT", "http://baz/", {"Origin": "http://foo"})
+
+        self.assertFalse(self.cache.observe_response(request, self._response("1")))
+        self.assertFalse(self.cache.observe_response(request, self._response("1")))
+        self.assertFalse(self.cache.observe_response(request, self._response(None)))
+        self.assertTrue(self.cache.observe_response(request, self._response("2")))
+
+        self.assertIsNone(self.cache.get(("http://foo", "http://baz/", "PUT", "")))
+        self.assertIsNotNone(self.cache.get(("http://bar", "http://baz/", "PUT", "")))
+        self.assertEqual(self.cache.invalidated, 1)
+
+    def test_versions_tracked_per_server(self):
+        other = ("http://foo", "http://qux/", "PUT", "")
+        self.cache.set(other, cache.CachedPreflight(
+            {"Access-Control-Allow-Origin": "*"}, time.time() + 3600))
+        baz = Request("PUT", "http://baz/", {"Origin": "http://foo"})
+        qux = Request("PUT", "http://qux/", {"Origin": "http://foo"})
+
+        for _ in range(2):
+            self.assertFalse(self.cache.observe_response(baz, self._response("A1")))
+            self.assertFalse(self.cache.observe_response(qux, self._response("B7")))
+
+        self.assertEqual(self.cache.invalidated, 0)
+        self.assertEqual(len(self.cache), 3)
+
+        self.assertTrue(self.cache.observe_response(qux, self._response("B8")))
+
+        self.assertIsNone(self.cache.get(other))
+        self.assertIsNotNone(self.cache.get(("http://foo", "http://baz/", "PUT", "")))
+
+    def test_versions_tracked_per_origin(self):
+        self.cache.observe_version("http://foo", "1")
+
+        self.assertFalse(self.cache.observe_version("http://bar", "2"))
+        self.assertEqual(len(self.cache), 2)
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import cors
+
+
+# Seconds `import cors` may take in a fresh interpreter.
+IMPORT_BUDGET = 0.01
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(cors.__file__)))
+
+
+def _run(code):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.check_output([sys.executable, "-c", code], env=env)
+    return json.loads(output)
+
+def _imported_by(module):
+    return set(_run(
+        "import json, sys\n"
+        "before = set(sys.modules)\n"
+        "import %s\n"
+        "print json.dumps(sorted(\n"
+        "    m for m in set(sys.modules) - before if sys.modules[m] is not None))"
+        % module))
+
+
+class ImportTimeTests(unittest.TestCase):
+    def test_import_within_budget(self):
+        # -X importtime doesn't exist on python 2, so time the import itself
+        elapsed = min(_run(
+            "import json, time\n"
+            "start = time.time()\n"
+            "import cors\n"
+            "print json.dumps(time.time() - start)")
+            for _ in range(3))
+
+        self.assertLess(elapsed, IMPORT_BUDGET)
+
+    def test_package_import_loads_nothing_else(self):
+        imported = _imported_by("cors")
+
+        self.assertEqual(set(m for m in imported if m.startswith("cors.")), set())
+
+    def test_preflight_import_defers_urlparse(self):
+        self.assertNotIn("urlparse", _imported_by("cors.preflight"))
+
+    def test_client_imports_defer_http_libraries(self):
+        self.assertNotIn("requests", _imported_by("cors.clients.requests"))
+        self.assertNotIn("tornado.httpclient", _imported_by("cors.clients.tornado"))
+
+
+class LazyAttributeTests(unittest.TestCase):
+    def test_public_names(self):
+        from cors.policy import Policy
+        from cors.preflight import prepare_preflight
+
+        self.assertIs(cors.Policy, Policy)
+        self.assertIs(cors.prepare_preflight, prepare_preflight)
+        self.assertIn("Policy", dir(cors))
+
+    def test_unknown_name(self):
+        with self.assertRaises(AttributeError):
+            cors.nothing_here
@@ -0,0 +1,29 @@
+import sys
+import unittest
+
+import mock
+
+from cors.lazy import LazyModule
+
+
+class LazyModuleTests(unittest.TestCase):
+    @mock.patch("importlib.import_module")
+    def test_imported_on_first_lookup_only(self, import_module):
+        module = LazyModule("urlparse")
+
+        self.assertFalse(import_module.called)
+        module.urlparse
+        module.urljoin
+        import_module.assert_called_once_with("urlparse")
+
+    def test_attributes_looked_up_each_time(self):
+        module = LazyModule("urlparse")
+        module.urlparse
+
+        with mock.patch("urlparse.urlparse") as urlparse:
+            self.assertIs(module.urlparse, urlparse)
+        self.assertIs(module.urlparse, sys.modules["urlparse"].urlparse)
+
+    def test_missing_attribute(self):
+        with self.assertRaises(AttributeError):
+            LazyModule("urlparse").nothing_here
@@ -0,0 +1,75 @@
+import unittest
+
+from cors import preflight
+from cors.plans import PlanTable, PreflightPlan, compile_plan, get_request_shape
+from cors.utils import Request
+
+
+def _requests():
+    return [
+        Request("GET", "http://foo/", {"Origin": "http://foo", "Host": "foo"}),
+        Request("GET", "http://foo/", {"Origin": "http://bar", "Host": "foo"}),
+        Request("DELETE", "http://foo/a", {"Origin": "http://bar", "Host": "foo"}),
+        Request("POST", "http://foo/b", {
+            "Origin": "http://bar",
+            "Host": "foo",
+            "Content-Type": "application/json",
+            "X-Foo": "baz",
+        }),
+        Request("OPTIONS", "http://foo/", {"Origin": "http://bar"}),
+    ]
+
+
+class Function_get_request_shape_Tests(unittest.TestCase):
+    def test_shape_ignores_url_and_values(self):
+        one = Request("PUT", "http://foo/a", {"Origin": "http://bar", "X-Foo": "1"})
+        two = Request("PUT", "http://foo/b", {"Origin": "http://baz", "x-foo": "2"})
+
+        self.assertEqual(get_request_shape(one), get_request_shape(two))
+
+    def test_same_origin_distinguishes_shapes(self):
+        one = Request("GET", "http://foo/", {"Origin": "http://foo"})
+        two = Request("GET", "http://foo/", {"Origin": "http://bar"})
+
+        self.assertNotEqual(get_request_shape(one), get_request_shape(two))
+
+
+class PlanTableTests(unittest.TestCase):
+    def test_matches_prepare_preflight(self):
+        table = PlanTable()
+
+        for request in _requests() * 2:
+            expected, expected_checks = preflight.prepare_preflight(request)
+            actual, checks = table.prepare_preflight(request)
+
+            self.assertEqual(checks, expected_checks)
+            if expected is None:
+                self.assertIsNone(actual)
+            else:
+                self.assertEqual(actual.method, expected.method)
+                self.assertEqual(actual.url, expected.url)
+                self.assertEqual(actual.headers, expected.headers)
+
+    def test_from_requests(self):
+        table = PlanTable.from_requests(_requests())
+
+        self.assertEqual(len(table), 5)
+
+
+class PreflightPlanTests(unittest.TestCase):
+    def test_immutable(self):
+        plan = compile_plan(_requests()[2])
+
+        with self.assertRaises(AttributeError):
+            plan.checks = ()
+
+    def test_compiled_round_trip(self):
+        plan = compile_plan(_requests()[3])
+
+        self.assertEqual(PreflightPlan.from_compiled(plan.compiled()), plan)
+
+    def test_checks_shared_between_plans(self):
+        one = compile_plan(_requests()[1])
+        two = compile_plan(Request("GET", "http://baz/", {"Origin": "http://bar"}))
+
+        self.assertIs(one.checks, two.checks)
@@ -0,0 +1,218 @@
+import unittest
+
+from cors.policy import Policy
+
+
+class PolicyOriginTests(unittest.TestCase):
+    def test_any_origin(self):
+        policy = Policy()
+
+        self.assertTrue(policy.allows_origin("http://foo"))
+        self.assertEqual(policy.allowed_origin("http://foo"), "*")
+
+    def test_listed_origins(self):
+        policy = Policy(origins=["http://foo", "https://*.example.com"])
+
+        self.assertTrue(policy.allows_origin("http://foo"))
+        self.assertTrue(policy.allows_origin("HTTP://FOO"))
+        self.assertTrue(policy.allows_origin("https://api.example.com"))
+        self.assertFalse(policy.allows_origin("https://example.com.evil"))
+        self.assertFalse(policy.allows_origin("http://bar"))
+        self.assertFalse(policy.allows_origin(None))
+        self.assertEqual(policy.allowed_origin("http://foo"), "http://foo")
+
+    def test_origin_string(self):
+        policy = Policy(origins="http://foo, http://bar")
+
+        self.assertTrue(policy.allows_origin("http://bar"))
+
+
+class PolicyPreflightTests(unittest.TestCase):
+    requested = {
+        "Origin": "http://foo",
+        "Access-Control-Request-Method": "PUT",
+        "access-control-request-headers": "X-Foo",
+    }
+
+    def test_echoes_request_by_default(self):
+        headers = Policy().preflight_response_headers(self.requested)
+
+        self.assertEqual(headers, {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "PUT",
+            "Access-Control-Allow-Headers": "X-Foo",
+        })
+
+    def test_configured_policy(self):
+        policy = Policy(
+            origins=["http://foo"],
+            methods=["put", "DELETE"],
+            headers=["x-foo", "x-bar"],
+            max_age=600,
+            credentials=True)
+
+        headers = policy.preflight_response_headers(self.requested)
+
+        self.assertEqual(headers, {
+            "Access-Control-Allow-Origin": "http://foo",
+            "Access-Control-Allow-Methods": "DELETE,PUT",
+            "Access-Control-Allow-Headers": "X-Bar,X-Foo",
+            "Access-Control-Max-Age": "600",
+            "Access-Control-Allow-Credentials": "true",
+            "Vary": "Origin",
+        })
+
+    def test_disallowed_origin(self):
+        policy = Policy(origins=["http://bar"])
+
+        self.assertEqual(policy.preflight_response_headers(self.requested), {})
+
+
+class PolicyActualResponseTests(unittest.TestCase):
+    def test_listed_origin(self):
+        policy = Policy(origins=["http://foo"], expose_headers=["x-foo"])
+
+        headers = policy.actual_response_headers({"X-Foo": "bar"}, "http://foo")
+
+        self.assertEqual(headers["Access-Control-Allow-Origin"], "http://foo")
+        self.assertEqual(headers["Access-Control-Expose-Headers"], "X-Foo")
+        self.assertEqual(headers["X-Foo"], "bar")
+
+    def test_disallowed_origin(self):
+        policy = Policy(origins=["http://foo"])
+
+        headers = policy.actual_response_headers({"X-Foo": "bar"}, "http://bar")
+
+        self.assertEqual(headers, {"X-Foo": "bar"})
+
+    def test_existing_vary_kept(self):
+        policy = Policy(origins=["http://foo"])
+
+        def vary(response):
+            return policy.actual_response_headers(response, "http://foo")
+
+        self.assertEqual(vary({"Vary": "Accept-Encoding"})["Vary"], "Accept-Encoding, Origin")
+        self.assertEqual(vary({"vary": "origin, Accept"})["vary"], "origin, Accept")
+        self.assertNotIn("Vary", vary({"vary": "origin, Accept"}))
+        self.assertEqual(vary({"Vary": "*"})["Vary"], "*")
+        self.assertEqual(vary({})["Vary"], "Origin")
+
+
+class PolicyCompiledStateTests(unittest.TestCase):
+    def test_round_trip(self):
+        policy = Policy(
+            origins=["http://foo", "https://*.example.com"],
+            methods=["PUT"],
+            max_age=60)
+
+        loaded = Policy.from_compiled(policy.compiled())
+
+        self.assertEqual(loaded.compiled(), policy.compiled())
+        self.assertTrue(loaded.allows_origin("https://api.example.com"))
+        self.assertFalse(loaded.allows_origin("http://bar"))
+
+
+class PolicyHeaderBlockTests(unittest.TestCase):
+    def test_preflight_block_matches_headers(self):
+        policy = Policy(origins=["http://foo"], methods=["GET", "PUT"], max_age=60)
+        requested = {"Origin": "http://foo", "Access-Control-Request-Method": "PUT"}
+
+        block = policy.preflight_header_block(requested)
+
+        self.assertEqual(block.headers, policy.preflight_response_headers(requested))
+        self.assertIn(b"Access-Control-Max-Age: 60\r\n", block.block)
+
+    def test_preflight_block_shared_by_origin_class(self):
+        policy = Policy(methods=["GET", "PUT"])
+
+        one = policy.preflight_header_block(
+            {"Origin": "http://foo", "Access-Control-Request-Method": "PUT"})
+        two = policy.preflight_header_block(
+            {"Origin": "http://bar", "Access-Control-Request-Method": "GET"})
+
+        self.assertIs(one, two)
+
+    def test_preflight_block_echoes_unlisted_method(self):
+        policy = Policy()
+
+        one = policy.preflight_header_block(
+            {"Origin": "http://foo", "Access-Control-Request-Method": "PUT"})
+        two = policy.preflight_header_block(
+            {"Origin": "http://foo", "Access-Control-Request-Method": "GET"})
+
+        self.assertEqual(one.headers["Access-Control-Allow-Methods"], "PUT")
+        self.assertEqual(two.headers["Access-Control-Allow-Methods"], "GET")
+
+    def test_disallowed_origin_block_empty(self):
+        policy = Policy(origins=["http://foo"])
+
+        self.assertEqual(policy.preflight_header_block({"Origin": "http://bar"}).block, b"")
+        self.assertEqual(policy.actual_header_block("http://bar").block, b"")
+
+    def test_actual_block(self):
+        policy = Policy(origins=["http://foo"], credentials=True)
+
+        block = policy.actual_header_block("http://foo", ["Content-Type", "X-Foo"])
+
+        self.assertEqual(block.headers["Access-Control-Allow-Origin"], "http://foo")
+        self.assertEqual(block.headers["Access-Control-Allow-Credentials"], "true")
+        self.assertEqual(block.headers["Vary"], "Origin")
+        self.assertNotIn("Content-Type", block.headers)
+        self.assertEqual(
+            block.headers["Access-Control-Expose-Headers"],
+            policy.actual_response_headers(
+                {"Content-Type": "", "X-Foo": ""},
+                "http://foo")["Access-Control-Expose-Headers"])
+        self.assertIs(block, policy.actual_header_block("http://foo", ["x-foo", "content-type"]))
+
+    def test_actual_block_listed_exposed_headers(self):
+        policy = Policy(expose_headers=["X-Foo"])
+
+        one = policy.actual_header_block("http://foo", ["X-Bar"])
+        two = policy.actual_header_block("http://bar", ["X-Baz"])
+
+        self.assertIs(one, two)
+        self.assertEqual(one.headers, {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Expose-Headers": "X-Foo",
+        })
+
+    def test_blocks_after_from_compiled(self):
+        policy = Policy.from_compiled(Policy(origins=["http://foo"]).compiled())
+
+        self.assertIn(b"Vary: Origin\r\n", policy.actual_header_block("http://foo").block)
+
+
+class PolicyVersionTests(unittest.TestCase):
+    def test_version_header(self):
+        policy = Policy(origins=["http://foo"], version=3)
+
+        preflight = policy.preflight_response_headers({"Origin": "http://foo"})
+        actual = policy.actual_response_headers({}, "http://foo")
+
+        self.assertEqual(preflight["CORS-Policy-Version"], "3")
+        self.assertEqual(actual["CORS-Policy-Version"], "3")
+        self.assertEqual(
+            policy.actual_header_block("http://foo").headers["CORS-Policy-Version"], "3")
+        self.assertEqual(Policy.from_compiled(policy.compiled()).version, "3")
+
+    def test_version_sent_to_refused_origins(self):
+        policy = Policy(origins=["http://foo"], version=3)
+
+        preflight = policy.preflight_response_headers({"Origin": "http://bar"})
+        actual = policy.actual_response_headers({"X-Foo": "1"}, "http://bar")
+
+        self.assertEqual(preflight, {"CORS-Policy-Version": "3"})
+        self.assertEqual(actual, {"X-Foo": "1", "CORS-Policy-Version": "3"})
+        self.assertEqual(
+            policy.preflight_header_block({"Origin": "http://bar"}).block,
+            b"CORS-Policy-Version: 3\r\n")
+        self.assertEqual(
+            policy.actual_header_block("http://bar").block, b"CORS-Policy-Version: 3\r\n")
+        self.assertEqual(
+            Policy(origins=["http://foo"]).actual_header_block("http://bar").block, b"")
+
+    def test_no_version(self):
+        self.assertNotIn(
+            "CORS-Policy-Version",
+            Policy().actual_response_headers({}, "http://foo"))
@@ -203,6 +203,26 @@ class Function_prepare_preflight_Tests(unittest.TestCase):
         self.assertIn(preflight.check_method, checks)
         self.assertIn(preflight.check_headers, checks)
 
+    def test_preflight_sent_from_origin(self):
+        request = _request(
+            url="http://foo.bar.baz/qux",
+            method="DELETE",
+            origin="http://quux")
+
+        preflight_request, _ = preflight.prepare_preflight(request)
+
+        self.assertEqual(preflight_request.headers["Origin"], "http://quux")
+
+    def test_checks_shared(self):
+        one = _request(url="http://foo.bar.baz/qux", method="DELETE")
+        two = _request(url="http://foo.bar.baz/quux", method="PUT")
+
+        _, one_checks = preflight.prepare_preflight(one)
+        _, two_checks = preflight.prepare_preflight(two)
+
+        self.assertIsInstance(one_checks, tuple)
+        self.assertIs(one_checks, two_checks)
+
     def test_options(self):
         request = _request(url="http://foo.bar.baz/qux", method="OPTIONS")
 
@@ -235,6 +255,12 @@ class Function_generate_acceptable_preflight_response_headers_Tests(unittest.Tes
         self.assertEqual(response["Access-Control-Allow-Origin"], "*")
         self.assertEqual(response["Access-Control-Allow-Methods"], "PUT")
         self.assertEqual(response["Access-Control-Allow-Headers"], "Content-Type")
+        self.assertNotIn("Access-Control-Max-Age", response)
+
+    def test_generate_headers_with_max_age(self):
+        response = self.method({}, max_age=600)
+
+        self.assertEqual(response["Access-Control-Max-Age"], "600")
 
 
 class Function_generate_acceptable_actual_response_headers_Tests(unittest.TestCase):
@@ -0,0 +1,135 @@
+import unittest
+
+import mock
+
+from cors import utils
+from cors.definitions import get_prohibited_headers
+from cors.policy import Policy
+from cors.raw import RawCORSHeaders, parse_header_block, parse_header_pairs
+from cors.utils import Request
+
+
+BLOCK = (
+    b"OPTIONS /api/items HTTP/1.1\r\n"
+    b"Host: api.example.com\r\n"
+    b"Origin: http://foo\r\n"
+    b"Access-Control-Request-Method:PUT\r\n"
+    b"access-control-request-headers: X-Foo, Content-Type  \r\n"
+    b"User-Agent: test\r\n"
+    b"\r\n")
+
+
+class Function_parse_header_block_Tests(unittest.TestCase):
+    def test_cors_fields(self):
+        headers = parse_header_block(BLOCK)
+
+        self.assertEqual(headers.origin, "http://foo")
+        self.assertEqual(headers.request_method, "PUT")
+        self.assertEqual(headers.request_headers, "X-Foo, Content-Type")
+        self.assertTrue(headers.is_preflight)
+
+    def test_names(self):
+        headers = parse_header_block(BLOCK)
+
+        self.assertEqual(headers.names, (
+            "access-control-request-headers",
+            "access-control-request-method",
+            "host",
+            "origin",
+            "user-agent",
+        ))
+
+    def test_names_shared(self):
+        self.assertIs(
+            parse_header_block(BLOCK).names,
+            Request("GET", "/", {
+                "host": "", "origin": "", "user-agent": "",
+                "access-control-request-method": "",
+                "access-control-request-headers": "",
+            }).header_names)
+
+    @mock.patch.dict("cors.utils._header_names", clear=True)
+    @mock.patch("cors.utils.MAX_SHARED_HEADER_NAMES", 10)
+    def test_names_bounded(self):
+        for i in range(100):
+            headers = parse_header_block(b"Origin: http://foo\r\nX-%d: 1\r\n" % i)
+
+        self.assertEqual(len(utils._header_names), 10)
+        self.assertEqual(headers.names, ("origin", "x-99"))
+
+    def test_buffer_types(self):
+        for block in (bytearray(BLOCK), memoryview(BLOCK), buffer(BLOCK)):
+            headers = parse_header_block(block)
+            self.assertEqual(headers.origin, "http://foo")
+            self.assertEqual(len(headers.names), 5)
+
+    def test_bare_newlines_and_folded_lines(self):
+        headers = parse_header_block(
+            b"Origin: http://foo\n"
+            b"X-Long: one\n"
+            b"  two\n")
+
+        self.assertEqual(headers.origin, "http://foo")
+        self.assertEqual(headers.names, ("origin", "x-long"))
+        self.assertFalse(headers.is_preflight)
+
+    def test_repeated_fields_combined(self):
+        headers = parse_header_block(
+            b"Access-Control-Request-Headers: X-Foo\r\n"
+            b"Access-Control-Request-Headers: X-Bar\r\n")
+
+        self.assertEqual(headers.request_headers, "X-Foo,X-Bar")
+        self.assertEqual(headers.names, ("access-control-request-headers",))
+
+
+class Function_parse_header_pairs_Tests(unittest.TestCase):
+    def test_asgi_headers(self):
+        headers = parse_header_pairs([
+            (b"host", b"api.example.com"),
+            (b"origin", b"http://foo"),
+            (b"access-control-request-method", b"DELETE"),
+        ])
+
+        self.assertEqual(headers.headers, {
+            "Origin": "http://foo",
+            "Access-Control-Request-Method": "DELETE",
+        })
+        self.assertEqual(
+            headers.names, ("access-control-request-method", "host", "origin"))
+
+
+class RawCORSHeadersTests(unittest.TestCase):
+    def test_immutable(self):
+        headers = RawCORSHeaders(["origin"], "http://foo")
+
+        with self.assertRaises(AttributeError):
+            headers.origin = "http://bar"
+
+    def test_prohibited_headers_match_request(self):
+        raw = parse_header_block(
+            b"Origin: http://foo\r\n"
+            b"Accept: */*\r\n"
+            b"X-Foo: 1\r\n"
+            b"X-Bar: 2\r\n")
+        request = Request("PUT", "http://api/", {
+            "Origin": "http://foo", "Accept": "*/*", "X-Foo": "1", "X-Bar": "2"})
+
+        self.assertEqual(raw.prohibited_headers(["X-Foo"]), set(["x-bar"]))
+        self.assertEqual(
+            raw.prohibited_headers("X-Foo"),
+            get_prohibited_headers(request, "X-Foo"))
+
+    def test_policy_evaluation(self):
+        policy = Policy(origins=["http://foo"], methods=["PUT"], max_age=60)
+        raw = parse_header_block(BLOCK)
+
+        self.assertEqual(
+            policy.preflight_header_block(raw.headers),
+            policy.preflight_header_block({
+                "Origin": "http://foo",
+                "Access-Control-Request-Method": "PUT",
+                "Access-Control-Request-Headers": "X-Foo, Content-Type",
+            }))
+        self.assertEqual(
+            policy.preflight_response_headers(raw.headers)["Access-Control-Allow-Origin"],
+            "http://foo")
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from cors.policy import Policy
+from cors.reload import FileWatcher, ReloadablePolicies
+from cors.routes import PolicyRegistry
+from cors.tuning import MaxAgeTuner
+
+
+class ReloadablePoliciesTests(unittest.TestCase):
+    def test_reload_swaps_current(self):
+        versions = iter([Policy(origins=["http://foo"]), Policy(origins=["http://bar"])])
+        policies = ReloadablePolicies(lambda: next(versions))
+        before = policies.current
+
+        policies.reload()
+
+        self.assertIsNot(policies.current, before)
+        self.assertTrue(policies.current.allows_origin("http://bar"))
+        # anything still holding the old policies is unaffected
+        self.assertTrue(before.allows_origin("http://foo"))
+
+    def test_failed_reload_keeps_current(self):
+        loads = [lambda: Policy(), lambda: {}["missing"]]
+        policies = ReloadablePolicies(lambda: loads.pop(0)())
+        before = policies.current
+
+        with self.assertRaises(KeyError):
+            policies.reload()
+
+        self.assertIs(policies.current, before)
+        self.assertEqual(policies.metrics.failures, 1)
+
+    def test_reload_shortens_tuned_max_age(self):
+        clock = [1000.0]
+        tuner = MaxAgeTuner(min_age=5, clock=lambda: clock[0])
+        policies = ReloadablePolicies(
+            lambda: PolicyRegistry({"/api": Policy()}, tuner=tuner))
+        requested = {"Origin": "http://foo", "Access-Control-Request-Method": "PUT"}
+
+        def max_age():
+            return policies.current.preflight_response_headers(
+                "/api", requested)["Access-Control-Max-Age"]
+
+        clock[0] += 600
+        self.assertEqual(max_age(), "600")
+
+        policies.reload()
+
+        self.assertEqual(max_age(), "5")
+
+    def test_reload_recorded_with_tuner(self):
+        tuner = MaxAgeTuner(clock=lambda: 1000.0)
+        policies = ReloadablePolicies(lambda: Policy(), tuner=tuner)
+
+        self.assertEqual(list(tuner._changed), [])
+
+        policies.reload()
+
+        self.assertEqual(list(tuner._changed), [1000.0])
+
+    def test_metrics(self):
+        registry = PolicyRegistry({"/a": Policy(), "/b": Policy()})
+        policies = ReloadablePolicies(lambda: registry)
+        policies.reload()
+
+        self.assertEqual(policies.metrics.reloads, 2)
+        self.assertEqual(policies.metrics.size, 2)
+        self.assertGreaterEqual(policies.metrics.last_duration, 0)
+        self.assertGreaterEqual(
+            policies.metrics.total_duration, policies.metrics.last_duration)
+
+    def test_readers_never_see_partial_state(self):
+        policies = ReloadablePolicies(lambda: PolicyRegistry(
+            ("/r/%d" % i, Policy()) for i in range(200)))
+        stop = threading.Event()
+        seen = []
+
+        def read():
+            while not stop.is_set():
+                seen.append(len(policies.current))
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            for _ in range(10):
+                policies.reload()
+        finally:
+            stop.set()
+            reader.join()
+
+        self.assertEqual(set(seen), set([200]))
+
+
+class FileWatcherTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "cors.json")
+        self._write({"/api": {"origins": ["http://foo"]}}, 1000)
+        self.policies = ReloadablePolicies.from_file(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, routes, mtime):
+        with open(self.path, "w") as f:
+            json.dump(routes, f)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_from_file(self):
+        self.assertTrue(self.policies.current.policy_for("/api/x").allows_origin("http://foo"))
+
+    def test_check_reloads_changed_file(self):
+        watcher = FileWatcher(self.policies)
+
+        self.assertFalse(watcher.check())
+
+        self._write({"/api": {"origins": ["http://bar"]}}, 2000)
+
+        self.assertTrue(watcher.check())
+        self.assertTrue(self.policies.current.policy_for("/api").allows_origin("http://bar"))
+
+    def test_broken_file_logged(self):
+        watcher = FileWatcher(self.policies)
+        before = self.policies.current
+        with open(self.path, "w") as f:
+            f.write("{")
+        os.utime(self.path, (2000, 2000))
+
+        self.assertFalse(watcher.check())
+        self.assertIs(self.policies.current, before)
+        self.assertEqual(self.policies.metrics.failures, 1)
+
+    def test_start_stop(self):
+        watcher = FileWatcher(self.policies, interval=0.01).start()
+        self._write({"/api": {"origins": ["http://bar"]}}, 2000)
+        try:
+            for _ in range(200):
+                if self.policies.metrics.reloads > 1:
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            watcher.stop()
+
+        self.assertEqual(self.policies.metrics.reloads, 2)
@@ -0,0 +1,92 @@
+import unittest
+
+from cors.policy import Policy
+from cors.routes import PolicyRegistry
+
+
+class PolicyRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.public = Policy()
+        self.partner = Policy(origins=["https://*.partner.com"], methods=["GET", "PUT"])
+        self.internal = Policy(origins=["https://admin.example.com"])
+        self.registry = PolicyRegistry({
+            "/api": self.public,
+            "/api/partners/*/orders": self.partner,
+            "/api/partners/acme/orders/archive": self.internal,
+            "/internal/": self.internal,
+        })
+
+    def test_longest_prefix(self):
+        self.assertIs(self.registry.policy_for("/api/items/1"), self.public)
+        self.assertIs(self.registry.policy_for("/api/partners/foo/orders/2"), self.partner)
+        self.assertIs(
+            self.registry.policy_for("/api/partners/acme/orders/archive/3"),
+            self.internal)
+        self.assertIs(self.registry.policy_for("/internal"), self.internal)
+
+    def test_wildcard_matches_one_segment(self):
+        self.assertIs(self.registry.policy_for("/api/partners/foo"), self.public)
+        self.assertIs(self.registry.policy_for("/api/partners/acme/orders"), self.partner)
+
+    def test_literal_beats_wildcard(self):
+        literal = Policy(origins=["http://foo"])
+        self.registry.register("/api/partners/acme/orders", literal)
+
+        self.assertIs(self.registry.policy_for("/api/partners/acme/orders/1"), literal)
+        self.assertIs(self.registry.policy_for("/api/partners/other/orders/1"), self.partner)
+
+    def test_query_ignored(self):
+        self.assertIs(
+            self.registry.policy_for("/internal/stats?path=/api"), self.internal)
+
+    def test_default(self):
+        self.assertIsNone(self.registry.policy_for("/other"))
+
+        registry = PolicyRegistry({"/api": self.partner}, default=self.public)
+
+        self.assertIs(registry.policy_for("/other"), self.public)
+
+    def test_response_headers(self):
+        requested = {
+            "Origin": "https://evil.com",
+            "Access-Control-Request-Method": "PUT",
+        }
+
+        self.assertEqual(self.registry.preflight_response_headers("/other", requested), {})
+        self.assertEqual(
+            self.registry.preflight_response_headers("/api/partners/a/orders", requested), {})
+        self.assertEqual(
+            self.registry.preflight_response_headers("/api/items", requested)[
+                "Access-Control-Allow-Origin"], "*")
+        self.assertEqual(
+            self.registry.actual_response_headers("/other", {"Foo": "bar"}, "http://foo"),
+            {"Foo": "bar"})
+
+    def test_header_block(self):
+        requested = {
+            "Origin": "https://shop.partner.com",
+            "Access-Control-Request-Method": "PUT",
+        }
+
+        self.assertIsNone(self.registry.preflight_header_block("/other", requested))
+        self.assertIs(
+            self.registry.preflight_header_block("/api/partners/a/orders", requested),
+            self.partner.preflight_header_block(requested))
+
+    def test_bulk_registration(self):
+        registry = PolicyRegistry()
+        registry.update(("/tenants/%d/items" % i, self.public) for i in range(5000))
+
+        self.assertEqual(len(registry), 5000)
+        self.assertIs(registry.policy_for("/tenants/4321/items/9"), self.public)
+        self.assertIsNone(registry.policy_for("/tenants/5000/items"))
+
+    def test_from_config_shares_policies(self):
+        registry = PolicyRegistry.from_config({
+            "/a": {"origins": ["http://foo"], "methods": ["GET"]},
+            "/b": {"methods": ["GET"], "origins": ["http://foo"]},
+            "/c": {"origins": "*"},
+        })
+
+        self.assertIs(registry.policy_for("/a"), registry.policy_for("/b"))
+        self.assertIsNot(registry.policy_for("/a"), registry.policy_for("/c"))
@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import tempfile
+
+import mock
+from tornado.gen import coroutine, sleep
+from tornado.testing import AsyncHTTPTestCase, gen_test
+from tornado.web import Application, RequestHandler
+
+from cors import scan
+from cors.utils import Request
+
+
+class Handler(RequestHandler):
+    in_flight = 0
+    most_in_flight = 0
+
+    @coroutine
+    def handler(self):
+        cls = type(self)
+        cls.in_flight += 1
+        cls.most_in_flight = max(cls.most_in_flight, cls.in_flight)
+        try:
+            yield sleep(0.01)
+        finally:
+            cls.in_flight -= 1
+        if self.get_argument("allow", False):
+            self.set_header("Access-Control-Allow-Origin", "*")
+            self.set_header("Access-Control-Allow-Methods", "GET,PUT")
+        if self.get_argument("fail", False):
+            self.set_status(403)
+
+    get = options = put = handler
+
+
+class ScannerTests(AsyncHTTPTestCase):
+    def setUp(self):
+        super(ScannerTests, self).setUp()
+        Handler.in_flight = Handler.most_in_flight = 0
+
+    def get_app(self):
+        return Application([(r"/.*", Handler)])
+
+    def _request(self, path, method="GET"):
+        return Request(method, self.get_url(path), {"Origin": "http://foo"})
+
+    def _scanner(self, **kwargs):
+        return scan.Scanner(client=self.http_client, **kwargs)
+
+    @gen_test
+    def test_ok(self):
+        result = yield self._scanner().scan_one(self._request("/?allow=1", "PUT"))
+
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual(result["method"], "PUT")
+        self.assertEqual(result["origin"], "http://foo")
+        self.assertIn("elapsed", result)
+
+    @gen_test
+    def test_violation(self):
+        result = yield self._scanner().scan_one(self._request("/", "PUT"))
+
+        self.assertEqual(result["status"], "violation")
+        self.assertIn("not allowed", result["error"])
+
+    @gen_test
+    def test_failed_preflight(self):
+        result = yield self._scanner().scan_one(self._request("/?allow=1&fail=1", "PUT"))
+
+        self.assertEqual(result["status"], "violation")
+        self.assertIn("403", result["error"])
+
+    @gen_test
+    def test_connection_error(self):
+        request = Request("PUT", "http://127.0.0.1:1/", {"Origin": "http://foo"})
+
+        result = yield self._scanner(timeout=1).scan_one(request)
+
+        self.assertEqual(result["status"], "error")
+
+    @gen_test
+    def test_same_origin_skipped(self):
+        request = Request("GET", self.get_url("/"), {"Origin": self.get_url("")})
+
+        result = yield self._scanner().scan_one(request)
+
+        self.assertEqual(result["status"], "skipped")
+
+    @gen_test
+    def test_actual(self):
+        scanner = self._scanner(actual=True)
+
+        allowed = yield scanner.scan_one(self._request("/?allow=1"))
+        # the preflight is allowed by Handler but the GET itself isn't
+        with mock.patch.object(scan, "prepare_preflight", return_value=(None, ())):
+            denied = yield scanner.scan_one(self._request("/"))
+
+        self.assertEqual(allowed["status"], "ok")
+        self.assertEqual(denied["status"], "violation")
+
+    @gen_test
+    def test_per_host_concurrency(self):
+        results = []
+
+        yield self._scanner(per_host=2).scan(
+            [self._request("/?allow=1", "PUT") for _ in range(10)], results.append)
+
+        self.assertEqual(len(results), 10)
+        self.assertEqual(set(r["status"] for r in results), set(["ok"]))
+        self.assertEqual(Handler.most_in_flight, 2)
+
+    @gen_test
+    def test_global_concurrency(self):
+        yield self._scanner(concurrency=3, per_host=10).scan(
+            [self._request("/?allow=1", "PUT") for _ in range(10)], lambda r: None)
+
+        self.assertEqual(Handler.most_in_flight, 3)
+
+
+class Function_main_Tests(AsyncHTTPTestCase):
+    def get_app(self):
+        return Application([(r"/.*", Handler)])
+
+    def test_json_lines(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "endpoints.json")
+        with open(path, "w") as f:
+            json.dump([
+                {"url": self.get_url("/?allow=1"), "origin": "http://foo", "method": "PUT"},
+                {"url": self.get_url("/"), "origin": "http://foo", "method": "PUT"},
+            ], f)
+
+        output = []
+        with mock.patch.object(scan, "create_client", return_value=self.http_client), \
+                mock.patch.object(scan.IOLoop, "current", return_value=self.io_loop), \
+                mock.patch("sys.stdout") as stdout:
+            stdout.write.side_effect = output.append
+            status = scan.main([path])
+
+        results = [json.loads(line) for line in output]
+        self.assertEqual(status, 1)
+        self.assertEqual(
+            sorted(r["status"] for r in results), ["ok", "violation"])
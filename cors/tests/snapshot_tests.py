@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from cors import snapshot
+from cors.utils import Request
+
+
+POLICIES = {
+    "public": {"origins": "*", "methods": ["GET"]},
+    "partners": {"origins": ["https://*.partner.com"], "max_age": 600},
+}
+
+REQUESTS = [
+    Request("PUT", "http://foo/", {"Origin": "http://bar", "X-Foo": "1"}),
+]
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "cors.snapshot")
+
+    def test_compiled_and_saved(self):
+        loaded = snapshot.load_or_compile(self.path, POLICIES, REQUESTS)
+
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(sorted(loaded.policies), ["partners", "public"])
+        self.assertEqual(len(loaded.plans), 1)
+
+    def test_loaded_without_compiling(self):
+        compiled = snapshot.load_or_compile(self.path, POLICIES, REQUESTS)
+
+        with mock.patch("cors.snapshot.Policy.__init__") as init:
+            loaded = snapshot.load_or_compile(self.path, POLICIES, REQUESTS)
+
+        self.assertEqual(init.call_count, 0)
+        self.assertEqual(loaded.plans.plans, compiled.plans.plans)
+        self.assertEqual(
+            loaded.policies["partners"].compiled(),
+            compiled.policies["partners"].compiled())
+        self.assertTrue(
+            loaded.policies["partners"].allows_origin("https://www.partner.com"))
+
+    def test_stale_snapshot_recompiled(self):
+        snapshot.load_or_compile(self.path, POLICIES, REQUESTS)
+        changed = dict(POLICIES, internal={"origins": ["http://intranet"]})
+
+        loaded = snapshot.load_or_compile(self.path, changed, REQUESTS)
+
+        self.assertIn("internal", loaded.policies)
+        source = snapshot.fingerprint(changed, REQUESTS)
+        self.assertIsNotNone(snapshot.load(self.path, source))
+
+    def test_corrupt_snapshot_rejected(self):
+        snapshot.load_or_compile(self.path, POLICIES, REQUESTS)
+        with open(self.path, "rb") as f:
+            data = bytearray(f.read())
+        data[-1] ^= 0xff
+
+        self.assertIsNone(snapshot.loads(bytes(data)))
+
+    def test_other_versions_rejected(self):
+        data = snapshot.dumps(
+            snapshot.Snapshot({}, snapshot.PlanTable()),
+            snapshot.fingerprint({}))
+
+        with mock.patch("cors.snapshot.SNAPSHOT_VERSION", snapshot.SNAPSHOT_VERSION + 1):
+            self.assertIsNone(snapshot.loads(data))
+
+    def test_missing_or_truncated_file(self):
+        self.assertIsNone(snapshot.load(self.path))
+        self.assertIsNone(snapshot.loads(b"CORS"))
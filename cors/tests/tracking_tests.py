@@ -0,0 +1,106 @@
+import unittest
+
+from cors.policy import Policy
+from cors.routes import PolicyRegistry
+from cors.tracking import PreflightTracker, preflight_shape
+
+
+def _preflight(origin, method="PUT", headers=None):
+    requested = {"Origin": origin, "Access-Control-Request-Method": method}
+    if headers:
+        requested["Access-Control-Request-Headers"] = headers
+    return requested
+
+
+class Function_preflight_shape_Tests(unittest.TestCase):
+    def test_normalized(self):
+        self.assertEqual(
+            preflight_shape({
+                "origin": "http://foo",
+                "access-control-request-method": "put",
+                "access-control-request-headers": "X-Foo, content-type",
+            }),
+            ("http://foo", "PUT", "content-type,x-foo"))
+
+
+class PreflightTrackerTests(unittest.TestCase):
+    def test_heavy_hitters(self):
+        tracker = PreflightTracker(k=3, width=256, depth=4)
+        for i in range(500):
+            tracker.observe(_preflight("http://noise%d" % i))
+        for _ in range(100):
+            tracker.observe(_preflight("http://heavy", headers="X-Foo"))
+        for _ in range(50):
+            tracker.observe(_preflight("http://medium", "DELETE"))
+
+        snapshot = tracker.snapshot()
+
+        self.assertEqual(snapshot.total, 650)
+        self.assertEqual(len(snapshot.top), 3)
+        self.assertEqual(snapshot.top[0][:3], ("http://heavy", "PUT", "x-foo"))
+        self.assertGreaterEqual(snapshot.top[0][3], 100)
+        self.assertEqual(snapshot.top[1][:3], ("http://medium", "DELETE", ""))
+        self.assertEqual(len(tracker.snapshot(1).top), 1)
+
+    def test_estimate_never_low(self):
+        tracker = PreflightTracker(width=16, depth=2)
+        shapes = [("http://%d" % i, "PUT", "") for i in range(100)]
+        for count, shape in enumerate(shapes):
+            tracker.add(shape, count)
+
+        for count, shape in enumerate(shapes):
+            self.assertGreaterEqual(tracker.estimate(shape), count)
+
+    def test_rows_collide_independently(self):
+        tracker = PreflightTracker(width=64, depth=4)
+        buckets = {}
+        for i in range(2000):
+            shape = ("http://%d" % i, "PUT", "")
+            indexes = tracker._indexes(shape)
+            buckets.setdefault(indexes[0], []).append(indexes[1:])
+
+        pairs = 0
+        collisions = [0, 0, 0]
+        for others in buckets.values():
+            for i, first in enumerate(others):
+                for second in others[i + 1:]:
+                    pairs += 1
+                    for row in range(3):
+                        collisions[row] += first[row] == second[row]
+
+        # about 1 in 64 pairs colliding in row 0 should collide in each other
+        for count in collisions:
+            self.assertLess(count, pairs * 0.05)
+
+    def test_deep_sketch(self):
+        tracker = PreflightTracker(width=16, depth=6)
+        tracker.add((u"http://f\xf6o", "PUT", ""), 3)
+
+        self.assertEqual(len(tracker._indexes((None, "", ""))), 8)
+        self.assertEqual(tracker.estimate((u"http://f\xf6o", "PUT", "")), 3)
+
+    def test_fixed_memory(self):
+        tracker = PreflightTracker(k=10, width=64)
+        for i in range(5000):
+            tracker.observe(_preflight("http://%d" % i))
+
+        self.assertEqual(len(tracker._top), 10)
+        self.assertLessEqual(len(tracker._heap), 40)
+        self.assertEqual(len(tracker._rows[0]), 64)
+
+    def test_clear(self):
+        tracker = PreflightTracker()
+        tracker.observe(_preflight("http://foo"))
+        tracker.clear()
+
+        self.assertEqual(tracker.snapshot().top, [])
+        self.assertEqual(tracker.estimate(("http://foo", "PUT", "")), 0)
+
+    def test_fed_by_registry(self):
+        tracker = PreflightTracker()
+        registry = PolicyRegistry({"/api": Policy(origins=["http://foo"])}, tracker=tracker)
+
+        registry.preflight_response_headers("/api", _preflight("http://foo"))
+        registry.preflight_response_headers("/other", _preflight("http://bar"))
+
+        self.assertEqual(tracker.snapshot().total, 2)
@@ -0,0 +1,100 @@
+import unittest
+
+from cors.policy import Policy
+from cors.routes import PolicyRegistry
+from cors.tuning import MaxAgeTuner
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class MaxAgeTunerTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.tuner = MaxAgeTuner(min_age=5, max_age=600, clock=self.clock)
+
+    def test_grows_while_policy_stable(self):
+        self.assertEqual(self.tuner.max_age("/api"), 5)
+
+        self.clock.now += 120
+
+        self.assertEqual(self.tuner.max_age("/api"), 120)
+
+        self.clock.now += 10000
+
+        self.assertEqual(self.tuner.max_age("/api"), 600)
+
+    def test_policy_change_resets(self):
+        self.clock.now += 10000
+        self.tuner.policy_changed("/api")
+
+        self.assertEqual(self.tuner.max_age("/api"), 5)
+        self.assertEqual(self.tuner.max_age("/other"), 600)
+
+        self.tuner.policy_changed()
+
+        self.assertEqual(self.tuner.max_age("/other"), 5)
+
+    def test_limited_by_change_history(self):
+        for _ in range(3):
+            self.tuner.policy_changed("/api")
+            self.clock.now += 100
+        self.clock.now += 1000
+
+        self.assertEqual(self.tuner.max_age("/api"), 50)
+
+    def test_estimated_saved(self):
+        self.clock.now += 600
+        self.assertEqual(self.tuner.observe("/api", "http://foo"), 600)
+        self.clock.now += 700
+        self.tuner.observe("/api", "http://foo")
+
+        report = self.tuner.report()
+
+        self.assertEqual(report.preflights, 2)
+        self.assertEqual(report.estimated_saved, 600 / 5 - 1)
+        self.assertEqual(report.tracked, 1)
+        self.assertAlmostEqual(self.tuner.rate("/api", "http://foo"), 1 / 700.0)
+
+    def test_tracked_keys_bounded(self):
+        tuner = MaxAgeTuner(max_keys=10, clock=self.clock)
+        for i in range(100):
+            tuner.observe("/api", "http://%d" % i)
+
+        self.assertEqual(tuner.report().tracked, 10)
+        self.assertIsNone(tuner.rate("/api", "http://0"))
+
+
+class RegistryTuningTests(unittest.TestCase):
+    def test_tuned_max_age(self):
+        clock = Clock()
+        tuner = MaxAgeTuner(clock=clock)
+        registry = PolicyRegistry({
+            "/api": Policy(),
+            "/fixed": Policy(max_age=30),
+        }, tuner=tuner)
+        clock.now += 300
+        requested = {"Origin": "http://foo", "Access-Control-Request-Method": "PUT"}
+
+        headers = registry.preflight_response_headers("/api/items", requested)
+        fixed = registry.preflight_response_headers("/fixed", requested)
+
+        self.assertEqual(headers["Access-Control-Max-Age"], "300")
+        self.assertEqual(fixed["Access-Control-Max-Age"], "30")
+        self.assertEqual(tuner.rate("/api", "http://foo"), None)
+        self.assertEqual(tuner.report().preflights, 1)
+
+    def test_refused_preflight_not_tuned(self):
+        tuner = MaxAgeTuner(clock=Clock())
+        registry = PolicyRegistry({"/api": Policy(origins=["http://foo"], version=2)}, tuner=tuner)
+        requested = {"Origin": "http://bar", "Access-Control-Request-Method": "PUT"}
+
+        headers = registry.preflight_response_headers("/api", requested)
+
+        self.assertEqual(headers, {"CORS-Policy-Version": "2"})
+        self.assertEqual(tuner.report().preflights, 0)
@@ -1,7 +1,10 @@
 import unittest
 
+import mock
+
+from cors import utils
 from cors.errors import AccessControlError
-from cors.utils import ProtectedHTTPHeaders
+from cors.utils import HeaderBlock, ProtectedHTTPHeaders, Request
 
 class ProtectedHTTPHeadersTests(unittest.TestCase):
     def setUp(self):
@@ -48,3 +51,66 @@ class ProtectedHTTPHeadersTests(unittest.TestCase):
 
         self.assertIn("not allowed", context.exception.message)
 
+
+
+class RequestTests(unittest.TestCase):
+    def test_immutable(self):
+        request = Request("GET", "http://foo/")
+
+        with self.assertRaises(AttributeError):
+            request.method = "POST"
+        with self.assertRaises(AttributeError):
+            del request.url
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(Request("GET", "http://foo/"), "__dict__"))
+
+    def test_method_interned(self):
+        method = "".join(["PA", "TCH"])
+
+        self.assertIs(Request(method, "http://foo/").method, intern("PATCH"))
+
+    def test_header_names_shared(self):
+        one = Request("GET", "http://foo/", {"Origin": "a", "X-Foo": "1"})
+        two = Request("GET", "http://bar/", {"x-foo": "2", "origin": "b"})
+
+        self.assertEqual(one.header_names, ("origin", "x-foo"))
+        self.assertIs(one.header_names, two.header_names)
+
+    @mock.patch.dict("cors.utils._header_names", clear=True)
+    @mock.patch("cors.utils.MAX_SHARED_HEADER_NAMES", 10)
+    def test_header_names_bounded(self):
+        shared = Request("GET", "http://foo/", {"Origin": "a"}).header_names
+        for i in range(100):
+            Request("GET", "http://foo/", {"X-%d" % i: "1"}).header_names
+
+        self.assertEqual(len(utils._header_names), 10)
+        self.assertIs(Request("GET", "http://bar/", {"origin": "b"}).header_names, shared)
+        self.assertEqual(
+            Request("GET", "http://foo/", {"X-Foo": "1"}).header_names, ("x-foo",))
+
+    def test_kwargs(self):
+        self.assertEqual(Request("GET", "http://foo/").kwargs, {})
+        self.assertEqual(
+            Request("GET", "http://foo/", timeout=5).kwargs, {"timeout": 5})
+
+
+class HeaderBlockTests(unittest.TestCase):
+    def test_encodings(self):
+        block = HeaderBlock({
+            u"Access-Control-Allow-Origin": u"http://f\xf6o",
+            "Vary": "Origin",
+        })
+
+        self.assertEqual(block.items, [
+            (b"Access-Control-Allow-Origin", b"http://f\xf6o"),
+            (b"Vary", b"Origin"),
+        ])
+        self.assertEqual(
+            block.block,
+            b"Access-Control-Allow-Origin: http://f\xf6o\r\nVary: Origin\r\n")
+        self.assertEqual(block.headers["Vary"], "Origin")
+        self.assertEqual(len(block), 2)
+
+    def test_empty(self):
+        self.assertEqual(HeaderBlock({}).block, b"")
@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from cors import cache, warmup
+from cors.utils import HeadersDict, Request
+
+
+def _session(allowed_headers="X-Foo"):
+    def send(request, **kwargs):
+        response = mock.MagicMock()
+        response.ok = "fail" not in request.url
+        response.headers = HeadersDict({
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": allowed_headers,
+        })
+        return response
+    session = mock.MagicMock()
+    session.send = mock.MagicMock(wraps=send)
+    return session
+
+
+class Function_load_manifest_Tests(unittest.TestCase):
+    def test_load_manifest(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "manifest.json")
+        with open(path, "w") as manifest:
+            json.dump([
+                {"url": "http://foo/", "origin": "http://bar"},
+                {"url": "http://foo/", "origin": "http://bar", "method": "put",
+                 "headers": {"X-Foo": "baz"}},
+            ], manifest)
+
+        requests = warmup.load_manifest(path)
+
+        self.assertEqual([r.method for r in requests], ["GET", "PUT"])
+        self.assertEqual(requests[1].headers, {"Origin": "http://bar", "X-Foo": "baz"})
+
+
+class Function_warm_up_Tests(unittest.TestCase):
+    def setUp(self):
+        self.cache = cache.PreflightCache()
+
+    def test_cache_filled(self):
+        shapes = [
+            Request("GET", "http://foo/%d" % i, {"Origin": "http://bar", "X-Foo": "1"})
+            for i in range(5)
+        ]
+        session = _session()
+
+        report = warmup.warm_up(shapes, self.cache, session, max_workers=2)
+
+        self.assertEqual(report.warmed, 5)
+        self.assertEqual(report.failed, [])
+        self.assertEqual(len(self.cache), 5)
+        self.assertEqual(session.send.call_count, 5)
+
+    def test_shared_preflights_sent_once(self):
+        shapes = [
+            Request("GET", "http://foo/", {"Origin": "http://bar", "X-Foo": "1"})
+            for _ in range(5)
+        ]
+        session = _session()
+
+        report = warmup.warm_up(shapes, self.cache, session)
+
+        self.assertEqual(report.warmed, 5)
+        self.assertEqual(session.send.call_count, 1)
+
+    def test_shapes_without_preflight_skipped(self):
+        shapes = [Request("GET", "http://foo/", {"Origin": "http://foo"})]
+        session = _session()
+
+        report = warmup.warm_up(shapes, self.cache, session)
+
+        self.assertEqual(report.skipped, 1)
+        self.assertEqual(session.send.call_count, 0)
+
+    def test_failures_reported(self):
+        failing = Request("GET", "http://foo/fail", {"Origin": "http://bar", "X-Foo": "1"})
+        prohibited = Request("GET", "http://foo/", {"Origin": "http://bar", "X-Bar": "1"})
+
+        report = warmup.warm_up([failing, prohibited], self.cache, _session())
+
+        self.assertEqual(report.warmed, 0)
+        self.assertEqual([r for r, _ in report.failed], [failing, prohibited])
+        self.assertEqual(report.failed[0][1].message, "Pre-flight check failed")
+
+
+class Function_main_Tests(unittest.TestCase):
+    @mock.patch("cors.warmup.pooled_session")
+    def test_main_fills_sqlite_cache(self, pooled_session):
+        pooled_session.return_value = _session()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        manifest = os.path.join(directory, "manifest.json")
+        database = os.path.join(directory, "preflights.db")
+        with open(manifest, "w") as f:
+            json.dump([{"url": "http://foo/", "origin": "http://bar",
+                        "headers": {"X-Foo": "1"}}], f)
+
+        status = warmup.main([manifest, "--sqlite", database])
+
+        self.assertEqual(status, 0)
+        self.assertEqual(len(cache.SQLiteBackend(database)), 1)
@@ -0,0 +1,139 @@
+import hashlib
+import heapq
+import os
+import struct
+import threading
+from array import array
+
+from cors.policy import _headers
+
+
+def preflight_shape(requested):
+    """
+    The (origin, method, requested headers) a preflight asks about.
+
+    """
+    requested = _headers(requested)
+    names = requested.get("Access-Control-Request-Headers", "")
+    names = ",".join(sorted(
+        name.strip().lower() for name in names.split(",") if name.strip()))
+    return (
+        requested.get("Origin"),
+        requested.get("Access-Control-Request-Method", "").upper(),
+        names,
+    )
+
+
+def _shape_key(shape):
+    return b"\0".join(
+        part.encode("utf-8") if isinstance(part, unicode) else bytes(part or "")
+        for part in shape)
+
+
+class TrackerSnapshot(object):
+    """
+    The heaviest preflight shapes a `PreflightTracker` has seen.
+
+    `top` lists (origin, method, headers, count) tuples, most frequent first.
+    Counts are estimates which may be too high but are never too low.
+
+    """
+    def __init__(self, total, top):
+        self.total = total
+        self.top = top
+
+
+class PreflightTracker(object):
+    """
+    Count preflights by origin, method and requested headers in fixed memory.
+
+    Counts are kept in a count-min sketch of depth rows of width counters, and
+    the k shapes with the highest counts are kept alongside it, so however
+    many distinct origins send preflights the tracker never grows.
+
+    Each row indexes counters by a digest of the shape keyed with a random
+    salt of the tracker's own, so rows collide independently of one another
+    and clients can't choose shapes which collide with someone else's.
+
+    """
+    def __init__(self, k=100, width=2048, depth=4):
+        self.k = k
+        self.width = width
+        self.total = 0
+        self._rows = [array("L", [0]) * width for _ in range(depth)]
+        # an md5 digest gives four rows their indexes
+        self._salts = [os.urandom(16) for _ in range(0, depth, 4)]
+        self._top = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def observe(self, requested):
+        """
+        Count a preflight given its request headers.
+
+        """
+        return self.add(preflight_shape(requested))
+
+    def add(self, shape, count=1):
+        """
+        Count shape, returning its estimated count so far.
+
+        """
+        with self._lock:
+            self.total += count
+            estimate = None
+            for index, row in zip(self._indexes(shape), self._rows):
+                row[index] += count
+                if estimate is None or row[index] < estimate:
+                    estimate = row[index]
+            self._update_top(shape, estimate)
+        return estimate
+
+    def _indexes(self, shape):
+        key = _shape_key(shape)
+        indexes = []
+        for salt in self._salts:
+            indexes.extend(struct.unpack("<4I", hashlib.md5(salt + key).digest()))
+        return [index % self.width for index in indexes]
+
+    def _update_top(self, shape, estimate):
+        top = self._top
+        if shape not in top and len(top) >= self.k:
+            # drop heap entries whose counts have since gone up
+            heap = self._heap
+            while heap and top.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            if estimate <= heap[0][0]:
+                return
+            del top[heapq.heappop(heap)[1]]
+
+        top[shape] = estimate
+        heapq.heappush(self._heap, (estimate, shape))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(c, s) for s, c in top.items()]
+            heapq.heapify(self._heap)
+
+    def estimate(self, shape):
+        with self._lock:
+            return min(
+                row[index] for index, row in zip(self._indexes(shape), self._rows))
+
+    def snapshot(self, n=None):
+        """
+        The n, or k, most frequent shapes as a `TrackerSnapshot`.
+
+        """
+        with self._lock:
+            top = sorted(self._top.items(), key=lambda item: -item[1])
+            total = self.total
+        return TrackerSnapshot(total, [
+            shape + (count,) for shape, count in top[:n or self.k]])
+
+    def clear(self):
+        with self._lock:
+            self.total = 0
+            for row in self._rows:
+                for index in xrange(self.width):
+                    row[index] = 0
+            self._top = {}
+            self._heap = []
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+from cors.cache import DEFAULT_MAX_AGE
+
+
+# Longest max-age to send by default, as long as Chromium will cache for. A
+# policy which has never been seen to change is not trusted for any longer.
+MAX_MAX_AGE = 7200
+
+
+class TuningReport(object):
+    """
+    What a `MaxAgeTuner` has seen.
+
+    estimated_saved is how many preflights the max-ages sent probably spared
+    the server, assuming each client kept making requests for as long as its
+    preflight was cached rather than preflighting every DEFAULT_MAX_AGE
+    seconds.
+
+    """
+    def __init__(self, preflights, estimated_saved, tracked):
+        self.preflights = preflights
+        self.estimated_saved = estimated_saved
+        self.tracked = tracked
+
+
+class MaxAgeTuner(object):
+    """
+    Choose Access-Control-Max-Age values from how often routes' policies
+    change and how often each origin preflights them.
+
+    A route's max-age is how long its policy has gone unchanged, limited to
+    half the average time between its past changes, and kept between min_age
+    and max_age. Routes start at min_age and lengthen as their policies prove
+    stable; `policy_changed` shortens them again.
+
+    Preflight counts and rates are kept for the max_keys most recent
+    (route, origin) pairs.
+
+    """
+    def __init__(self, min_age=DEFAULT_MAX_AGE, max_age=MAX_MAX_AGE,
+                 max_keys=10000, history=16, clock=time.time):
+        self.bounds = (min_age, max_age)
+        self.max_keys = max_keys
+        self.history = history
+        self.clock = clock
+        self.preflights = 0
+        self.estimated_saved = 0.0
+        self._started = clock()
+        self._changed = deque(maxlen=history)
+        self._route_changes = {}
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def policy_changed(self, route=None):
+        """
+        Record that the policy for route, or every route, just changed.
+
+        """
+        now = self.clock()
+        with self._lock:
+            if route is None:
+                self._changed.append(now)
+            else:
+                self._route_changes.setdefault(
+                    route, deque(maxlen=self.history)).append(now)
+
+    def _changes(self, route):
+        changes = sorted(list(self._changed) + list(self._route_changes.get(route, ())))
+        return changes[-self.history:]
+
+    def max_age(self, route, origin=None):
+        """
+        The longest max-age it is currently safe to send for route.
+
+        """
+        now = self.clock()
+        with self._lock:
+            changes = self._changes(route)
+
+        age = now - (changes[-1] if changes else self._started)
+        if len(changes) > 1:
+            mean = (changes[-1] - changes[0]) / (len(changes) - 1)
+            age = min(age, mean / 2)
+        min_age, max_age = self.bounds
+        return int(max(min_age, min(max_age, age)))
+
+    def observe(self, route, origin):
+        """
+        Record a preflight from origin to route and return the max-age to send.
+
+        """
+        age = self.max_age(route, origin)
+        now = self.clock()
+        key = (route, origin)
+        with self._lock:
+            self.preflights += 1
+            seen = self._keys.pop(key, None)
+            if seen is None:
+                seen = {"count": 0, "interval": None, "last": None, "age": None}
+            else:
+                gap = now - seen["last"]
+                covered = min(seen["age"], gap)
+                self.estimated_saved += max(0.0, covered / float(DEFAULT_MAX_AGE) - 1)
+                if seen["interval"] is None:
+                    seen["interval"] = gap
+                else:
+                    seen["interval"] = 0.8 * seen["interval"] + 0.2 * gap
+            seen["count"] += 1
+            seen["last"] = now
+            seen["age"] = age
+            self._keys[key] = seen
+            if len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        return age
+
+    def rate(self, route, origin):
+        """
+        Preflights per second from origin to route, or None if unknown.
+
+        """
+        with self._lock:
+            seen = self._keys.get((route, origin))
+        if seen is None or not seen["interval"]:
+            return None
+        return 1.0 / seen["interval"]
+
+    def report(self):
+        with self._lock:
+            return TuningReport(
+                self.preflights, int(self.estimated_saved), len(self._keys))
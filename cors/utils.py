@@ -1,8 +1,5 @@
 from cors.errors import AccessControlError
-from cors.definitions import (
-    CORS_RESPONSE_HEADERS,
-    SIMPLE_RESPONSE_HEADERS,
-)
+from cors.definitions import READABLE_RESPONSE_HEADERS
 
 
 class HeadersDict(dict):
@@ -15,7 +12,7 @@ class HeadersDict(dict):
 
     @staticmethod
     def normalize(key):
-        return "-".join(map(str.capitalize, key.split("-")))
+        return "-".join(part.capitalize() for part in key.split("-"))
 
     def __getitem__(self, key):
         return super(HeadersDict, self).__getitem__(self.normalize(key))
@@ -40,14 +37,15 @@ class ProtectedHTTPHeaders(HeadersDict):
         self.exposed_headers = exposed_headers
         if isinstance(exposed_headers, basestring):
             exposed_headers = exposed_headers.split(",")
-            exposed_headers = map(str.strip, exposed_headers)
-        self.exposed_headers = map(str.lower, exposed_headers)
+            exposed_headers = [h.strip() for h in exposed_headers]
+        self.exposed_headers = [h.lower() for h in exposed_headers]
 
     def check_header_accessible(self, name):
-        if name.lower() in SIMPLE_RESPONSE_HEADERS | CORS_RESPONSE_HEADERS:
+        if name.lower() in READABLE_RESPONSE_HEADERS:
             return
         if name.lower() not in self.exposed_headers:
-            raise AccessControlError("Access to header %r not allowed." % name)
+            raise AccessControlError(
+                "Access to header %r not allowed.", format_args=(name,))
 
     def __getitem__(self, name):
         self.check_header_accessible(name)
@@ -58,13 +56,98 @@ class ProtectedHTTPHeaders(HeadersDict):
         return super(ProtectedHTTPHeaders, self).get(name, default)
 
 
+# Sets of header names shared at most. Requests may carry any headers at all,
+# so once this many have been seen new ones are no longer shared.
+MAX_SHARED_HEADER_NAMES = 4096
+
+_header_names = {}
+
+def _share_header_names(names):
+    shared = _header_names.get(names)
+    if shared is not None:
+        return shared
+    if len(_header_names) < MAX_SHARED_HEADER_NAMES:
+        return _header_names.setdefault(names, names)
+    return names
+
+def intern_header_names(headers):
+    """
+    The lowercased names of headers as a tuple shared by equal sets of names,
+    as long as no more than `MAX_SHARED_HEADER_NAMES` sets have been seen.
+
+    """
+    return _share_header_names(tuple(sorted(h.lower() for h in headers)))
+
+
 class Request(object):
     """
     HTTP library agnostic request class.
 
+    Requests are immutable and keep no per-instance __dict__, so that large
+    numbers of them can be held in memory. Methods are interned, as are the
+    tuples of header names which `header_names` returns.
+
     """
+    __slots__ = ("method", "url", "headers", "_kwargs")
+
     def __init__(self, method, url, headers=None, **kwargs):
-        self.method = method
-        self.url = url
-        self.headers = headers or {}
-        self.kwargs = kwargs
+        headers = headers or {}
+        set_ = super(Request, self).__setattr__
+        set_("method", intern(str(method)))
+        set_("url", url)
+        set_("headers", headers)
+        set_("_kwargs", kwargs or None)
+
+    @property
+    def kwargs(self):
+        return dict(self._kwargs or {})
+
+    @property
+    def header_names(self):
+        return intern_header_names(self.headers)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Request objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Request objects are immutable")
+
+    def __repr__(self):
+        return "<Request %s %s>" % (self.method, self.url)
+
+
+def _latin1(value):
+    if isinstance(value, unicode):
+        return value.encode("latin-1")
+    return bytes(value)
+
+
+class HeaderBlock(object):
+    """
+    Response headers encoded once, ready to be sent as they are.
+
+    `headers` is the usual dict form, `items` a list of (bytes, bytes) pairs
+    for servers which take those and `block` the headers as a single
+    "Name: value\\r\\n" string for servers which write them straight out.
+
+    """
+    __slots__ = ("headers", "items", "block")
+
+    def __init__(self, headers):
+        items = [
+            (_latin1(name), _latin1(value))
+            for name, value in sorted(headers.items())
+        ]
+        set_ = super(HeaderBlock, self).__setattr__
+        set_("headers", dict(headers))
+        set_("items", items)
+        set_("block", b"".join(b"%s: %s\r\n" % item for item in items))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("HeaderBlock objects are immutable")
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return "<HeaderBlock %r>" % self.block
@@ -0,0 +1,130 @@
+"""
+Warm a preflight cache up before traffic arrives.
+
+    python -m cors.warmup manifest.json --sqlite /tmp/cors-preflights.db
+
+The manifest is a JSON list of request shapes, each an object with a "url", an
+"origin" and optionally a "method" (GET by default) and "headers".
+
+"""
+from __future__ import absolute_import
+
+import argparse
+import json
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+
+from cors.cache import PreflightCache, RedisBackend, SQLiteBackend
+from cors.clients.requests import check_preflight, pooled_session
+from cors.errors import AccessControlError
+from cors.lazy import LazyModule
+from cors.preflight import prepare_preflight
+from cors.utils import Request
+
+
+requests = LazyModule("requests")
+
+
+class WarmupReport(object):
+    """
+    The outcome of warming a cache up.
+
+    `failed` lists a `(request, error)` tuple for each shape whose preflight
+    couldn't be sent or didn't allow it.
+
+    """
+    def __init__(self, elapsed, warmed, skipped, failed):
+        self.elapsed = elapsed
+        self.warmed = warmed
+        self.skipped = skipped
+        self.failed = failed
+
+
+def load_manifest(path):
+    """
+    Read the request shapes from a manifest file.
+
+    """
+    with open(path) as manifest:
+        shapes = json.load(manifest)
+
+    requests_ = []
+    for shape in shapes:
+        headers = dict(shape.get("headers", {}))
+        headers["Origin"] = shape["origin"]
+        requests_.append(Request(
+            str(shape.get("method", "GET")).upper(),
+            shape["url"],
+            headers))
+    return requests_
+
+
+def warm_up(requests_, cache, session=None, max_workers=8):
+    """
+    Send the preflights needed by requests concurrently to fill cache.
+
+    """
+    session = session or pooled_session(max_workers)
+    skipped = []
+    preflights = []
+    for request in requests_:
+        preflight, checks = prepare_preflight(request)
+        if preflight is None:
+            skipped.append(request)
+        else:
+            preflights.append((preflight, checks, request))
+
+    def warm(args):
+        preflight, checks, request = args
+        try:
+            check_preflight(session, preflight, checks, request, cache)
+        except (AccessControlError, requests.RequestException) as e:
+            return request, e
+        return request, None
+
+    start = time.time()
+    pool = ThreadPool(max_workers)
+    try:
+        results = pool.map(warm, preflights, chunksize=1)
+    finally:
+        pool.terminate()
+
+    failed = [(request, e) for request, e in results if e is not None]
+    return WarmupReport(
+        time.time() - start,
+        len(preflights) - len(failed),
+        len(skipped),
+        failed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Send the preflights for a manifest of request shapes "
+                    "to warm up a shared preflight cache.")
+    parser.add_argument("manifest")
+    parser.add_argument("--workers", type=int, default=8)
+    backends = parser.add_mutually_exclusive_group(required=True)
+    backends.add_argument("--sqlite", metavar="PATH")
+    backends.add_argument("--redis", metavar="URL")
+    args = parser.parse_args(argv)
+
+    if args.sqlite:
+        backend = SQLiteBackend(args.sqlite)
+    else:
+        backend = RedisBackend(url=args.redis)
+
+    report = warm_up(
+        load_manifest(args.manifest),
+        PreflightCache(backend),
+        max_workers=args.workers)
+
+    print "warmed %d preflights in %.3fs (%d shapes needed none)" % (
+        report.warmed, report.elapsed, report.skipped)
+    for request, error in report.failed:
+        print >> sys.stderr, "failed: %s %s: %s" % (request.method, request.url, error)
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())